@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Інкрементальні резервні копії файлів даних
+
+Файли ріжуться на шматки з межами, що залежать від вмісту (текстові - по
+рядках, бінарні знімки - gear-хешем по байтах), кожен шматок зберігається
+один раз під іменем свого SHA-256:
+    <каталог>/chunks/ab/abcdef...   - стиснуті шматки
+    <каталог>/manifests/<час>.json  - склад файлів на момент копії
+Змінений запис зачіпає лише один-два шматки, решта використовуються повторно.
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from collections import deque
+from datetime import datetime
+
+CHUNK_MIN = 16 * 1024
+CHUNK_MAX = 256 * 1024
+BOUNDARY_MASK = 0x3FF  # межа в середньому раз на ~1024 рядки
+WINDOW_LINES = 8  # рядків у ковзному вікні хешу
+
+# Як і git, вважаємо файл бінарним, якщо на початку є нульовий байт
+BINARY_PROBE = 8000
+
+# Gear-хеш для бінарних файлів: 64-бітний, кожен байт зсуває його на 1 біт,
+# тож старші біти залежать від останніх 64 байтів
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'little') for i in range(256)]
+GEAR_BITS = 0xFFFFFFFFFFFFFFFF
+GEAR_MASK = 0x3FFF << 50  # межа в середньому раз на ~16 КБ після CHUNK_MIN
+GEAR_WINDOW = 64
+
+TIMESTAMP_FORMAT = '%Y%m%dT%H%M%S%f'
+
+
+class BackupError(Exception):
+    """Пошкоджена або відсутня резервна копія"""
+
+
+def split_chunks(data):
+    """Розрізати байти на шматки з межами, що залежать від вмісту"""
+    if b'\0' in data[:BINARY_PROBE]:
+        return split_bytes(data)
+    return split_lines(data)
+
+
+def split_bytes(data):
+    """Межі для бінарних даних (знімки без переносів рядків).
+
+    Межа ставиться, коли старші біти gear-хешу останніх GEAR_WINDOW байтів
+    нульові; перші CHUNK_MIN байтів шматка не хешуються взагалі.
+    """
+    chunks = []
+    gear = GEAR
+    start = 0
+    size = len(data)
+
+    while start < size:
+        end = min(size, start + CHUNK_MAX)
+        cut = end
+        first = start + CHUNK_MIN
+        rolling = 0
+        for position in range(max(start, first - GEAR_WINDOW), end):
+            rolling = ((rolling << 1) + gear[data[position]]) & GEAR_BITS
+            if position >= first and not rolling & GEAR_MASK:
+                cut = position + 1
+                break
+        chunks.append(data[start:cut])
+        start = cut
+    return chunks
+
+
+def split_lines(data):
+    """Межі для текстових даних (JSON з відступами).
+
+    Межа ставиться після рядка, коли сума CRC32 останніх WINDOW_LINES рядків
+    має нульові молодші біти, тож вставка запису зсуває лише сусідні межі.
+    """
+    chunks = []
+    view = memoryview(data)
+    window = deque()
+    rolling = 0
+    start = 0
+    position = 0
+    size = len(data)
+
+    while position < size:
+        end = data.find(b'\n', position)
+        end = size if end == -1 else end + 1
+
+        line_hash = zlib.crc32(view[position:end])
+        window.append(line_hash)
+        rolling += line_hash
+        if len(window) > WINDOW_LINES:
+            rolling -= window.popleft()
+        position = end
+
+        length = position - start
+        if (length >= CHUNK_MIN and not rolling & BOUNDARY_MASK) or length >= CHUNK_MAX:
+            # Дуже довгі рядки (бінарні файли) ріжемо на шматки фіксованого розміру
+            while position - start > CHUNK_MAX:
+                chunks.append(data[start:start + CHUNK_MAX])
+                start += CHUNK_MAX
+            chunks.append(data[start:position])
+            start = position
+
+    if start < size:
+        chunks.append(data[start:size])
+    return chunks
+
+
+def _chunk_path(backup_dir, digest):
+    return os.path.join(backup_dir, 'chunks', digest[:2], digest)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _manifest_checksum(files):
+    body = json.dumps(files, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(body).hexdigest()
+
+
+def list_manifests(backup_dir):
+    """Імена маніфестів від найстаршого до найновішого"""
+    manifest_dir = os.path.join(backup_dir, 'manifests')
+    if not os.path.isdir(manifest_dir):
+        return []
+    return sorted(name for name in os.listdir(manifest_dir) if name.endswith('.json'))
+
+
+def load_manifest(backup_dir, name):
+    """Прочитати маніфест і перевірити його контрольну суму"""
+    with open(os.path.join(backup_dir, 'manifests', name), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if _manifest_checksum(manifest['files']) != manifest['checksum']:
+        raise BackupError(f"Маніфест {name} пошкоджено")
+    return manifest
+
+
+def _store_file(backup_dir, path, stat):
+    """Зберегти нові шматки файлу; повертає опис файлу для маніфесту"""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    digests = []
+    written = 0
+    for chunk in split_chunks(data):
+        digest = hashlib.sha256(chunk).hexdigest()
+        chunk_path = _chunk_path(backup_dir, digest)
+        if not os.path.exists(chunk_path):
+            _write_atomic(chunk_path, zlib.compress(chunk))
+            written += 1
+        digests.append(digest)
+
+    entry = {
+        'size': len(data),
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'chunks': digests,
+    }
+    return entry, written
+
+
+def create_backup(paths, backup_dir, keep):
+    """Створити інкрементальну копію файлів.
+
+    Файли з незміненими розміром і mtime не перечитуються. Повертає
+    (ім'я маніфесту, кількість нових шматків) або (None, 0), якщо
+    з останньої копії нічого не змінилося.
+    """
+    manifests = list_manifests(backup_dir)
+    previous = load_manifest(backup_dir, manifests[-1])['files'] if manifests else {}
+
+    files = {}
+    written = 0
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        old = previous.get(path)
+        if old and old['size'] == stat.st_size and old['mtime_ns'] == stat.st_mtime_ns:
+            files[path] = old
+            continue
+        files[path], new_chunks = _store_file(backup_dir, path, stat)
+        written += new_chunks
+
+    if files == previous:
+        return None, 0
+
+    now = datetime.now()
+    name = f"{now.strftime(TIMESTAMP_FORMAT)}.json"
+    manifest = {
+        'timestamp': now.isoformat(),
+        'files': files,
+        'checksum': _manifest_checksum(files),
+    }
+    _write_atomic(
+        os.path.join(backup_dir, 'manifests', name),
+        json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+    )
+    prune(backup_dir, keep)
+    return name, written
+
+
+def prune(backup_dir, keep):
+    """Залишити keep останніх копій і видалити шматки, на які вони не посилаються"""
+    manifests = list_manifests(backup_dir)
+    for name in manifests[:-keep]:
+        os.remove(os.path.join(backup_dir, 'manifests', name))
+
+    referenced = set()
+    for name in manifests[-keep:]:
+        for entry in load_manifest(backup_dir, name)['files'].values():
+            referenced.update(entry['chunks'])
+
+    chunks_dir = os.path.join(backup_dir, 'chunks')
+    if not os.path.isdir(chunks_dir):
+        return
+    for prefix in os.listdir(chunks_dir):
+        for digest in os.listdir(os.path.join(chunks_dir, prefix)):
+            if digest not in referenced:
+                os.remove(os.path.join(chunks_dir, prefix, digest))
+
+
+def find_manifest(backup_dir, at=None):
+    """Найновіший маніфест, створений не пізніше за at (datetime)"""
+    manifests = list_manifests(backup_dir)
+    if at is not None:
+        limit = at.strftime(TIMESTAMP_FORMAT)
+        manifests = [name for name in manifests if name[:-len('.json')] <= limit]
+    if not manifests:
+        raise BackupError("Немає резервної копії на вказаний час")
+    return manifests[-1]
+
+
+def restore(backup_dir, at=None, target_dir='.', managed=()):
+    """Відновити файли на момент at у target_dir.
+
+    Файли з managed, яких ще не було на момент копії, видаляються з
+    target_dir, щоб результат відповідав стану на той час.
+    Повертає (маніфест, відновлені файли, видалені файли).
+    """
+    name = find_manifest(backup_dir, at)
+    manifest = load_manifest(backup_dir, name)
+    restored = []
+
+    for path, entry in manifest['files'].items():
+        data = bytearray()
+        for digest in entry['chunks']:
+            try:
+                with open(_chunk_path(backup_dir, digest), 'rb') as f:
+                    chunk = zlib.decompress(f.read())
+            except FileNotFoundError:
+                raise BackupError(f"Відсутній шматок {digest} файлу {path}")
+            if hashlib.sha256(chunk).hexdigest() != digest:
+                raise BackupError(f"Пошкоджено шматок {digest} файлу {path}")
+            data += chunk
+
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise BackupError(f"Контрольна сума {path} не збігається")
+
+        target = os.path.join(target_dir, path)
+        _write_atomic(target, bytes(data))
+        restored.append(target)
+
+    removed = []
+    for path in managed:
+        target = os.path.join(target_dir, path)
+        if path not in manifest['files'] and os.path.exists(target):
+            os.remove(target)
+            removed.append(target)
+
+    return manifest, restored, removed
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк генерації сітки: python bench_bracket.py [кількість команд] [раундів]
+"""
+
+import random
+import sys
+import time
+
+import bracket
+
+
+def main():
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 11
+
+    registrations = [
+        {'team_name': f"Team {i}", 'team_tag': f"T{i % 1000}", 'user_id': i}
+        for i in range(teams)
+    ]
+    state = bracket.new_bracket(bracket.seed_teams(registrations, randomize=True))
+    rng = random.Random(42)
+
+    worst = 0.0
+    for number in range(1, rounds + 1):
+        started = time.perf_counter()
+        matches = bracket.pair_swiss_round(state)
+        elapsed = time.perf_counter() - started
+        worst = max(worst, elapsed)
+        print(f"Swiss раунд {number:2}: {len(matches)} матчів за {elapsed * 1000:.1f} мс")
+
+        for match in matches:
+            if match['winner'] is None:
+                match['winner'] = rng.choice((match['a'], match['b']))
+
+    total_matches = sum(len(r) - (r[0]['b'] is None) for r in state['swiss']['rounds'])
+    rematches = total_matches - len(bracket.played_pairs(state))
+
+    started = time.perf_counter()
+    bracket.build_single_elimination(bracket.swiss_ranking(state), best_of=3)
+    playoff_time = time.perf_counter() - started
+
+    print(f"Плей-офф на {teams} команд: {playoff_time * 1000:.1f} мс")
+    print(f"Найдовший раунд Swiss: {worst * 1000:.1f} мс, повторних зустрічей: {rematches}")
+
+    if worst >= 1.0:
+        sys.exit("❌ Генерація раунду перевищила 1 секунду")
+
+
+if __name__ == '__main__':
+    main()
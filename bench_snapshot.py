@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк збереження/завантаження команд: JSON (save_data) проти знімка
+python bench_snapshot.py [кількість команд ...]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import snapshot
+
+
+def make_team(i):
+    team = {
+        'team_name': f"Team {i}",
+        'team_tag': f"T{i % 10000}",
+        'cap_nick': f"captain{i}",
+        'cap_name': "Олександр Петренко",
+        'cap_age': 19,
+        'cap_steam': str(76561198000000000 + i),
+        'cap_discord': f"captain{i}#0001",
+        'cap_tg': f"@captain{i}",
+        'comments': "Без коментарів",
+        'timestamp': "2025-11-01T12:00:00",
+        'user_id': 100000 + i,
+    }
+    for n in range(2, 6):
+        team[f'p{n}_nick'] = f"player{n}_{i}"
+        team[f'p{n}_name'] = "Гравець"
+        team[f'p{n}_age'] = 18
+        team[f'p{n}_steam'] = str(76561199000000000 + i * 10 + n)
+    return team
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def bench(count, tmp_dir):
+    teams = [make_team(i) for i in range(count)]
+    json_path = os.path.join(tmp_dir, f'registrations_{count}.json')
+    snap_path = os.path.join(tmp_dir, f'registrations_{count}.snap')
+
+    def save_json():
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(teams, f, ensure_ascii=False, indent=2)
+
+    def load_json():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def labels_json():
+        return [(team['team_name'], team['team_tag']) for team in load_json()]
+
+    def labels_snapshot():
+        with snapshot.Snapshot(snap_path) as snap:
+            return snap.labels()
+
+    _, json_save = timed(save_json)
+    _, json_load = timed(load_json)
+    _, json_labels = timed(labels_json)
+    _, snap_save = timed(lambda: snapshot.write_snapshot(snap_path, teams))
+    loaded, snap_load = timed(lambda: snapshot.read_snapshot(snap_path))
+    _, snap_labels = timed(labels_snapshot)
+    assert loaded == teams
+
+    print(
+        f"{count:>7} команд | "
+        f"JSON: запис {json_save:8.1f} мс, читання {json_load:8.1f} мс, "
+        f"назви {json_labels:8.1f} мс, {os.path.getsize(json_path) / 1e6:6.1f} МБ | "
+        f"знімок: запис {snap_save:8.1f} мс, читання {snap_load:8.1f} мс, "
+        f"назви {snap_labels:8.1f} мс, {os.path.getsize(snap_path) / 1e6:6.1f} МБ"
+    )
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in counts:
+            bench(count, tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Сітка турніру: посів, швейцарська система та плей-офф (Single Elimination)
+Модуль не залежить від Telegram - лише дані у вигляді dict/list,
+які зберігаються у bracket.json
+"""
+
+import secrets
+from itertools import groupby
+
+# Скільки суперників вперед/назад перебирати, щоб уникнути повторної зустрічі
+SWAP_WINDOW = 8
+
+
+def seed_teams(registrations, randomize=False):
+    """Сформувати учасників сітки з зареєстрованих команд.
+
+    За замовчуванням посів - за порядком реєстрації,
+    randomize=True - випадковий посів через secrets.
+    """
+    order = list(range(len(registrations)))
+    if randomize:
+        # Fisher-Yates на криптографічному генераторі
+        for i in range(len(order) - 1, 0, -1):
+            j = secrets.randbelow(i + 1)
+            order[i], order[j] = order[j], order[i]
+
+    entrants = []
+    for seed, index in enumerate(order):
+        team = registrations[index]
+        entrants.append({
+            'id': seed,
+            'team_name': team['team_name'],
+            'team_tag': team['team_tag'],
+            'user_id': team.get('user_id'),
+        })
+    return entrants
+
+
+def new_bracket(entrants):
+    """Порожній стан турніру для заданих учасників"""
+    return {
+        'entrants': entrants,
+        'swiss': {'rounds': [], 'byes': []},
+        'playoff': None,
+    }
+
+
+def make_match(match_id, a, b, best_of=1):
+    """Матч між учасниками a та b (b=None - технічна перемога a)"""
+    return {
+        'id': match_id,
+        'a': a,
+        'b': b,
+        'best_of': best_of,
+        'winner': a if b is None else None,
+        'score': None,
+    }
+
+
+def _pair_key(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def played_pairs(state):
+    """Множина пар, які вже грали між собою у швейцарській системі"""
+    played = set()
+    for round_matches in state['swiss']['rounds']:
+        for match in round_matches:
+            if match['b'] is not None:
+                played.add(_pair_key(match['a'], match['b']))
+    return played
+
+
+def swiss_scores(state):
+    """Кількість перемог кожного учасника у швейцарській системі"""
+    scores = dict.fromkeys((e['id'] for e in state['entrants']), 0)
+    for round_matches in state['swiss']['rounds']:
+        for match in round_matches:
+            if match['winner'] is not None:
+                scores[match['winner']] += 1
+    return scores
+
+
+def round_complete(round_matches):
+    """Чи всі матчі раунду мають переможця"""
+    return all(match['winner'] is not None for match in round_matches)
+
+
+def _pair_group(group, played, pairs):
+    """Голландська система в одній групі очок: верхня половина проти нижньої.
+
+    При повторній зустрічі суперник з нижньої половини міняється з сусіднім
+    у межах SWAP_WINDOW. Повертає кількість вимушених повторних зустрічей.
+    """
+    half = len(group) // 2
+    top, bottom = group[:half], group[half:]
+    rematches = 0
+
+    for i, a in enumerate(top):
+        if _pair_key(a, bottom[i]) in played:
+            swapped = False
+            # Спершу шукаємо серед ще не розподілених суперників
+            for j in range(i + 1, min(half, i + 1 + SWAP_WINDOW)):
+                if _pair_key(a, bottom[j]) not in played:
+                    bottom[i], bottom[j] = bottom[j], bottom[i]
+                    swapped = True
+                    break
+            # Потім пробуємо обмінятися з уже сформованою парою
+            if not swapped:
+                for k in range(i - 1, max(-1, i - 1 - SWAP_WINDOW), -1):
+                    if (_pair_key(a, bottom[k]) not in played
+                            and _pair_key(top[k], bottom[i]) not in played):
+                        bottom[i], bottom[k] = bottom[k], bottom[i]
+                        pairs[len(pairs) - (i - k)] = (top[k], bottom[k])
+                        swapped = True
+                        break
+            if not swapped:
+                rematches += 1
+        pairs.append((a, bottom[i]))
+
+    return rematches
+
+
+def pair_swiss_round(state):
+    """Згенерувати наступний раунд швейцарської системи.
+
+    Учасники сортуються за (очки, посів) один раз, групуються за очками,
+    і кожна група паруються за O(розмір групи * SWAP_WINDOW). Непарний
+    учасник групи опускається в наступну групу. Повертає список матчів.
+    """
+    swiss = state['swiss']
+    if swiss['rounds'] and not round_complete(swiss['rounds'][-1]):
+        raise ValueError("Попередній раунд ще не завершено")
+
+    scores = swiss_scores(state)
+    played = played_pairs(state)
+    ranked = sorted(scores, key=lambda team_id: (-scores[team_id], team_id))
+
+    round_number = len(swiss['rounds']) + 1
+    matches = []
+
+    # Bye - найнижчий учасник без попереднього bye
+    if len(ranked) % 2:
+        had_bye = set(swiss['byes'])
+        for pos in range(len(ranked) - 1, -1, -1):
+            if ranked[pos] not in had_bye:
+                bye_team = ranked.pop(pos)
+                break
+        else:
+            bye_team = ranked.pop()
+        swiss['byes'].append(bye_team)
+        matches.append(make_match(f"S{round_number}-bye", bye_team, None))
+
+    pairs = []
+    floaters = []
+    for _, members in groupby(ranked, key=lambda team_id: scores[team_id]):
+        group = floaters + list(members)
+        floaters = [group.pop()] if len(group) % 2 else []
+        if group:
+            _pair_group(group, played, pairs)
+
+    for number, (a, b) in enumerate(pairs, 1):
+        matches.append(make_match(f"S{round_number}-{number}", a, b))
+
+    swiss['rounds'].append(matches)
+    return matches
+
+
+def _seed_positions(size):
+    """Порядок посіву в сітці на size місць: 1-16, 8-9, ... (size - степінь 2)"""
+    positions = [0]
+    while len(positions) < size:
+        total = len(positions) * 2
+        positions = [p for seed in positions for p in (seed, total - 1 - seed)]
+    return positions
+
+
+def build_single_elimination(team_ids, best_of=3):
+    """Побудувати дерево плей-офф для учасників у порядку посіву.
+
+    Кількість місць доповнюється до степеня двійки, найсильніші посіви
+    отримують технічні перемоги (bye) у першому раунді.
+    """
+    if len(team_ids) < 2:
+        raise ValueError("Для плей-офф потрібно щонайменше 2 команди")
+
+    size = 1
+    while size < len(team_ids):
+        size *= 2
+
+    slots = [team_ids[p] if p < len(team_ids) else None for p in _seed_positions(size)]
+
+    rounds = [[
+        make_match(f"P1-{n + 1}", slots[2 * n], slots[2 * n + 1], best_of)
+        for n in range(size // 2)
+    ]]
+    while len(rounds[-1]) > 1:
+        number = len(rounds) + 1
+        rounds.append([
+            make_match(f"P{number}-{n + 1}", None, None, best_of)
+            for n in range(len(rounds[-1]) // 2)
+        ])
+
+    playoff = {'best_of': best_of, 'rounds': rounds}
+    for match in rounds[0]:
+        if match['winner'] is not None:
+            advance_winner(playoff, match['id'])
+    return playoff
+
+
+def find_match(state, match_id):
+    """Знайти матч за ідентифікатором (S<раунд>-<n> або P<раунд>-<n>)"""
+    if match_id.startswith('S'):
+        rounds = state['swiss']['rounds']
+    elif match_id.startswith('P') and state.get('playoff'):
+        rounds = state['playoff']['rounds']
+    else:
+        return None
+
+    try:
+        round_number = int(match_id[1:].split('-')[0])
+    except ValueError:
+        return None
+    if not 1 <= round_number <= len(rounds):
+        return None
+    for match in rounds[round_number - 1]:
+        if match['id'] == match_id:
+            return match
+    return None
+
+
+def advance_winner(playoff, match_id):
+    """Перемістити переможця матчу плей-офф у наступний матч дерева"""
+    round_number, number = (int(x) for x in match_id[1:].split('-'))
+    rounds = playoff['rounds']
+    match = rounds[round_number - 1][number - 1]
+    if round_number == len(rounds):
+        return None
+
+    next_match = rounds[round_number][(number - 1) // 2]
+    next_match['a' if number % 2 else 'b'] = match['winner']
+    return next_match
+
+
+def swiss_ranking(state):
+    """Учасники у порядку (очки, посів) - для відбору в плей-офф"""
+    scores = swiss_scores(state)
+    return sorted(scores, key=lambda team_id: (-scores[team_id], team_id))
@@ -5,12 +5,29 @@ Telegram бот для CS2 турніру
 Покращена версія з редагуванням та видаленням команд
 """
 
+import argparse
+import asyncio
+import codecs
+import csv
+import io
+import hashlib
+import heapq
+import hmac
+import itertools
 import logging
 import json
 import os
+import random
 import re
-from datetime import datetime
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove
+import secrets
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import httpx
+from telegram import Update, InputFile, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -18,9 +35,17 @@ from telegram.ext import (
     CallbackQueryHandler,
     ConversationHandler,
     ContextTypes,
+    BaseUpdateProcessor,
+    TypeHandler,
     filters,
 )
 from telegram.ext import Updater
+from telegram.request import HTTPXRequest
+
+import backup
+import bracket
+import snapshot
+import standings
 
 # Налаштування логування
 logging.basicConfig(
@@ -34,6 +59,15 @@ BOT_TOKEN = os.getenv("BOT_TOKEN", "8429851174:AAFgYXpsRSmJcYBYswjTc8Ni__oNZ_nJY
 ADMIN_IDS = [int(x.strip()) for x in os.getenv("ADMIN_IDS", "7937123770").split(",")]
 GROUP_LINK = os.getenv("GROUP_LINK", "https://t.me/cs2_WPL")
 CHANNEL_LINK = os.getenv("CHANNEL_LINK", "https://t.me/your_channel")
+FLOOD_RATE = float(os.getenv("FLOOD_RATE", "1"))  # запитів на секунду
+FLOOD_BURST = int(os.getenv("FLOOD_BURST", "5"))
+MAX_CONCURRENT_HANDLERS = int(os.getenv("MAX_CONCURRENT_HANDLERS", "16"))
+SHED_QUEUE_DEPTH = int(os.getenv("SHED_QUEUE_DEPTH", "500"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "32"))
+DATA_FORMAT = os.getenv("DATA_FORMAT", "json")  # json або snapshot
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_INTERVAL = int(os.getenv("BACKUP_INTERVAL", "900"))  # секунд
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "96"))  # кількість копій
 # ===========================================
 
 # Стани для реєстрації
@@ -51,11 +85,33 @@ EDIT_SELECT_TEAM, EDIT_SELECT_FIELD, EDIT_INPUT_VALUE = range(3)
 # Файли для зберігання даних
 REGISTRATIONS_FILE = 'registrations.json'
 SUBSCRIBERS_FILE = 'subscribers.json'
+GIVEAWAYS_FILE = 'giveaways.json'
+BRACKET_FILE = 'bracket.json'
+SCHEDULE_FILE = 'schedule.json'
+
+# Файли-списки, які можна зберігати у бінарному форматі знімків
+SNAPSHOT_FILES = (REGISTRATIONS_FILE, SUBSCRIBERS_FILE)
 
 # ============= ФУНКЦІЇ ДЛЯ РОБОТИ З ДАНИМИ =============
 
+def snapshot_path(filename):
+    """Шлях до бінарного знімка для JSON-файлу даних"""
+    return os.path.splitext(filename)[0] + '.snap'
+
+def uses_snapshot(filename):
+    """Чи зберігається файл у форматі знімка"""
+    return DATA_FORMAT == 'snapshot' and filename in SNAPSHOT_FILES
+
 def load_data(filename):
     """Завантажити дані з файлу"""
+    # Якщо знімка ще немає - читаємо старий JSON (перехід між форматами)
+    if uses_snapshot(filename) and os.path.exists(snapshot_path(filename)):
+        try:
+            return snapshot.read_snapshot(snapshot_path(filename))
+        except snapshot.SnapshotError as e:
+            # Порожній список не повертаємо - наступне збереження знищило б дані
+            logger.error("Знімок пошкоджено: %s. Відновіть його: python main.py restore", e)
+            raise
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             return json.load(f)
@@ -63,9 +119,15 @@ def load_data(filename):
         return [] if filename == REGISTRATIONS_FILE else []
 
 def save_data(filename, data):
-    """Зберегти дані у файл"""
-    with open(filename, 'w', encoding='utf-8') as f:
+    """Зберегти дані у файл (атомарно: тимчасовий файл + заміна)"""
+    if uses_snapshot(filename):
+        snapshot.write_snapshot(snapshot_path(filename), data)
+        return
+
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_filename, filename)
 
 def add_subscriber(user_id):
     """Додати підписника"""
@@ -84,6 +146,49 @@ def validate_steam_id(steam_id):
     """Перевірка чи Steam ID містить тільки цифри"""
     return steam_id.isdigit() and len(steam_id) >= 8
 
+MIN_AGE = 16
+TAG_MIN_LENGTH, TAG_MAX_LENGTH = 2, 5
+
+def validate_field(field, value):
+    """Перевірити значення поля команди за правилами реєстрації.
+
+    Повертає (нормалізоване значення, None) або (None, текст помилки).
+    """
+    value = value.strip()
+    if field == 'team_tag':
+        tag = value.upper()
+        if not TAG_MIN_LENGTH <= len(tag) <= TAG_MAX_LENGTH:
+            return None, f"❌ Тег має бути {TAG_MIN_LENGTH}-{TAG_MAX_LENGTH} символів"
+        return tag, None
+    if field.endswith('_age'):
+        try:
+            age = int(value)
+        except ValueError:
+            return None, "❌ Введіть число"
+        if age < MIN_AGE:
+            return None, f"❌ Вік від {MIN_AGE} років"
+        return age, None
+    if field.endswith('_steam'):
+        if not validate_steam_id(value):
+            return None, "❌ Steam ID має містити тільки цифри (мінімум 8)"
+        return value, None
+    if not value:
+        return None, "❌ Значення не може бути порожнім"
+    return value, None
+
+def team_labels():
+    """Назви й теги команд (зі знімка - без декодування повних записів)"""
+    path = snapshot_path(REGISTRATIONS_FILE)
+    if uses_snapshot(REGISTRATIONS_FILE) and os.path.exists(path):
+        # CRC32 всього файлу тут не рахуємо - інакше лінивого читання не буде
+        try:
+            with snapshot.Snapshot(path, verify=False) as snap:
+                return snap.labels()
+        except snapshot.SnapshotError as e:
+            logger.error("Знімок пошкоджено: %s. Відновіть його: python main.py restore", e)
+            raise
+    return [(team['team_name'], team['team_tag']) for team in load_data(REGISTRATIONS_FILE)]
+
 def get_team_by_index(index):
     """Отримати команду за індексом"""
     registrations = load_data(REGISTRATIONS_FILE)
@@ -91,15 +196,6 @@ def get_team_by_index(index):
         return registrations[index]
     return None
 
-def update_team(index, team_data):
-    """Оновити дані команди"""
-    registrations = load_data(REGISTRATIONS_FILE)
-    if 0 <= index < len(registrations):
-        registrations[index] = team_data
-        save_data(REGISTRATIONS_FILE, registrations)
-        return True
-    return False
-
 def delete_team(index):
     """Видалити команду"""
     registrations = load_data(REGISTRATIONS_FILE)
@@ -109,22 +205,121 @@ def delete_team(index):
         return deleted
     return None
 
+# ============= ВИХІДНІ ЗАПИТИ ДО TELEGRAM API =============
+
+API_MAX_RETRIES = 3
+API_BACKOFF_BASE = 0.5  # секунд
+API_BACKOFF_MAX = 8.0
+API_MAX_RETRY_AFTER = 30  # довше чекати не будемо - віддаємо помилку
+API_BREAKER_THRESHOLD = 5  # мережевих збоїв поспіль до розмикання
+API_BREAKER_COOLDOWN = 30.0
+
+# Методи, які безпечно повторювати після мережевого збою (не створюють дублікатів)
+IDEMPOTENT_METHODS = {
+    'getChat', 'getMe', 'answerCallbackQuery', 'editMessageText',
+    'editMessageReplyMarkup', 'deleteMessage', 'getFile',
+}
+
+# Збої, після яких запит гарантовано не дійшов до Telegram - повтор безпечний завжди
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+class ApiUnavailable(NetworkError):
+    """Telegram API недоступний - запит відхилено без спроби"""
+
+class ResilientRequest(HTTPXRequest):
+    """Єдиний шар вихідних запитів: повтори, backoff, circuit breaker.
+
+    Усі виклики бота (reply_text, edit_text, send_message, get_chat...)
+    проходять через post(), тож обробникам не потрібно обробляти
+    тимчасові збої самостійно.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = 0
+        self.open_until = 0.0
+        self.retried = 0
+        self.rejected = 0
+
+    def _check_breaker(self):
+        if self.failures >= API_BREAKER_THRESHOLD and time.monotonic() < self.open_until:
+            self.rejected += 1
+            raise ApiUnavailable("Telegram API тимчасово недоступний")
+
+    def _record_failure(self):
+        self.failures += 1
+        if self.failures >= API_BREAKER_THRESHOLD:
+            # Після паузи пропускаємо пробний запит (half-open)
+            self.open_until = time.monotonic() + API_BREAKER_COOLDOWN
+            logger.warning("Circuit breaker розімкнуто на %s с", API_BREAKER_COOLDOWN)
+
+    async def post(self, url, request_data=None, **kwargs):
+        method = url.rsplit('/', 1)[-1]
+        attempt = 0
+
+        while True:
+            self._check_breaker()
+            try:
+                result = await super().post(url, request_data, **kwargs)
+            except RetryAfter as exc:
+                if attempt >= API_MAX_RETRIES or exc.retry_after > API_MAX_RETRY_AFTER:
+                    raise
+                delay = exc.retry_after + random.uniform(0, API_BACKOFF_BASE)
+            except BadRequest as exc:
+                if 'message is not modified' in str(exc).lower():
+                    return True
+                raise
+            except (Forbidden, ApiUnavailable):
+                raise
+            except NetworkError as exc:
+                self._record_failure()
+                # Неідемпотентні методи повторюємо, лише якщо запит точно не надіслано
+                retryable = method in IDEMPOTENT_METHODS or isinstance(exc.__cause__, UNSENT_ERRORS)
+                if not retryable or attempt >= API_MAX_RETRIES:
+                    raise
+                delay = random.uniform(0, min(API_BACKOFF_MAX, API_BACKOFF_BASE * 2 ** attempt))
+            else:
+                self.failures = 0
+                return result
+
+            attempt += 1
+            self.retried += 1
+            logger.info("Повтор %s через %.1f с (спроба %s)", method, delay, attempt)
+            await asyncio.sleep(delay)
+
+api_request = ResilientRequest(
+    connection_pool_size=API_POOL_SIZE,
+    pool_timeout=5.0,
+    connect_timeout=5.0,
+    read_timeout=10.0,
+    write_timeout=10.0,
+)
+
 # ============= ГОЛОВНЕ МЕНЮ =============
 
-def get_main_menu():
-    """Головне меню бота"""
-    keyboard = [
+# Статичні екрани та клавіатури будуються один раз і перебудовуються
+# лише коли змінюється конфігурація, від якої вони залежать
+_screens = {}
+_screens_config = None
+
+TEAM_RENDER_CACHE_SIZE = 512
+_team_render_cache = OrderedDict()
+
+def _back_keyboard(callback_data='back_to_main'):
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("◀️ Назад", callback_data=callback_data)
+    ]])
+
+def _build_screens():
+    """Побудувати всі статичні екрани (текст + клавіатура)"""
+    main_menu = InlineKeyboardMarkup([
         [InlineKeyboardButton("🎮 Зареєструвати команду", callback_data='register')],
         [InlineKeyboardButton("📢 Наша група", url=GROUP_LINK)],
         [InlineKeyboardButton("ℹ️ Інформація про турнір", callback_data='info')],
         [InlineKeyboardButton("🏆 Призи", callback_data='prizes')],
         [InlineKeyboardButton("📋 Правила", callback_data='rules')],
-    ]
-    return InlineKeyboardMarkup(keyboard)
-
-def get_admin_menu():
-    """Меню для адміністраторів"""
-    keyboard = [
+    ])
+    admin_menu = InlineKeyboardMarkup([
         [InlineKeyboardButton("📊 Статистика", callback_data='admin_stats')],
         [InlineKeyboardButton("📋 Всі команди (детально)", callback_data='admin_teams_full')],
         [InlineKeyboardButton("✏️ Редагувати команду", callback_data='admin_edit')],
@@ -132,10 +327,117 @@ def get_admin_menu():
         [InlineKeyboardButton("📢 Розсилка", callback_data='admin_broadcast')],
         [InlineKeyboardButton("🎁 Розіграш", callback_data='admin_giveaway')],
         [InlineKeyboardButton("◀️ Назад", callback_data='back_to_main')],
-    ]
-    return InlineKeyboardMarkup(keyboard)
+    ])
+    back = _back_keyboard()
+
+    return {
+        'main_menu': (None, main_menu),
+        'admin_menu': ("🔧 АДМІН-ПАНЕЛЬ\n\nОберіть дію:", admin_menu),
+        'register': (
+            "📝 РЕЄСТРАЦІЯ КОМАНДИ\n\n"
+            "Щоб зареєструвати команду, використайте команду:\n"
+            "/register\n\n"
+            "Бот проведе вас через весь процес реєстрації крок за кроком.",
+            back
+        ),
+        'info': (
+            "ℹ️ ІНФОРМАЦІЯ ПРО ТУРНІР\n\n"
+            "📅 Дата: Листопад 2025\n"
+            "🎮 Гра: Counter-Strike 2\n"
+            "👥 Формат: 5 на 5\n"
+            "🇺🇦 Регіон: Україна\n"
+            "🔞 Вік: 16+\n\n"
+            "📍 Платформа: Online\n"
+            "🎯 Система: Single Elimination / Swiss\n"
+            "⏰ Час матчів: За розкладом\n\n"
+            "📢 Група турніру: " + GROUP_LINK,
+            back
+        ),
+        'prizes': (
+            "🏆 ПРИЗИ\n\n"
+            "💰 1 місце: $200\n"
+            "⭐ MVP турніру: $50\n\n"
+            "Загальний призовий фонд: $250\n\n"
+            "🎁 Додаткові призи:\n"
+            "• Унікальні ролі в Discord\n"
+            "• Фічер в соцмережах\n"
+            "• Запрошення на майбутні турніри\n\n"
+            "💳 Виплати через:\n"
+            "• Monobank\n"
+            "• PrivatBank\n"
+            "• USDT (TRC20)",
+            back
+        ),
+        'rules': (
+            "📋 ПРАВИЛА ТУРНІРУ\n\n"
+            "✅ Загальні правила:\n"
+            "• Офіційні правила CS2 Competitive\n"
+            "• Анті-чіт обов'язковий\n"
+            "• Заборонено використання читів\n"
+            "• Тайм-аути: 4 паузи по 30 сек\n\n"
+            "🎮 Налаштування:\n"
+            "• MR12 (12 раундів до зміни)\n"
+            "• Best of 1 (плей-офф: BO3)\n\n"
+            "⚠️ Штрафи:\n"
+            "• Запізнення 15+ хв = поразка\n"
+            "• Токсичність = дискваліфікація\n\n"
+            "📢 Повні правила: " + GROUP_LINK,
+            back
+        ),
+        'admin_broadcast': (
+            "📢 РОЗСИЛКА\n\n"
+            "Використайте команду:\n"
+            "/broadcast ваше повідомлення\n\n"
+            "Повідомлення буде відправлено всім підписникам.\n"
+            "Для частини аудиторії: /broadcast --segment <сегмент> текст\n"
+            "Сегменти: " + SEGMENTS_HELP,
+            admin_menu
+        ),
+        'admin_giveaway': (
+            "🎁 РОЗІГРАШ\n\n"
+            "Використайте команду:\n"
+            "/giveaway [кількість] [registered_only]\n\n"
+            "Буде обрано вказану кількість різних переможців.\n"
+            "registered_only - лише капітани зареєстрованих команд.",
+            admin_menu
+        ),
+        'edit_done': (None, InlineKeyboardMarkup([[
+            InlineKeyboardButton("◀️ До адмін-панелі", callback_data='back_to_admin')
+        ]])),
+    }
+
+def get_screen(name):
+    """Отримати закешований екран (текст, клавіатура)"""
+    global _screens, _screens_config
+    config = (GROUP_LINK,)
+    if config != _screens_config:
+        _screens = _build_screens()
+        _screens_config = config
+    return _screens[name]
+
+def get_main_menu():
+    """Головне меню бота"""
+    return get_screen('main_menu')[1]
+
+def get_admin_menu():
+    """Меню для адміністраторів"""
+    return get_screen('admin_menu')[1]
 
 def format_team_full(team, index):
+    """Повна інформація про команду з кешем за версією команди"""
+    key = (index, team.get('user_id'), team.get('timestamp'), team.get('version', 0))
+    text = _team_render_cache.get(key)
+    if text is not None:
+        _team_render_cache.move_to_end(key)
+        return text
+
+    text = _render_team_full(team, index)
+    _team_render_cache[key] = text
+    if len(_team_render_cache) > TEAM_RENDER_CACHE_SIZE:
+        _team_render_cache.popitem(last=False)
+    return text
+
+def _render_team_full(team, index):
     """Форматування повної інформації про команду"""
     text = (
         f"━━━━━━━━━━━━━━━━━━━━\n"
@@ -177,6 +479,218 @@ def format_team_full(team, index):
     )
     return text
 
+# ============= КОНТРОЛЬ ФЛУДУ =============
+
+FLOOD_NOTICE_INTERVAL = 30  # секунд між попередженнями одному користувачу
+FLOOD_TRACKED_USERS = 10000
+
+class FloodControl:
+    """Token bucket на кожного user_id в обмеженому LRU"""
+
+    def __init__(self, rate, burst, max_users):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        # user_id -> [токени, час останнього поповнення, час останнього попередження]
+        self.buckets = OrderedDict()
+        self.dropped = 0
+        self.notices = 0
+
+    def check(self, user_id, now):
+        """Повертає (дозволено, чи надіслати попередження)"""
+        bucket = self.buckets.get(user_id)
+        if bucket is None:
+            bucket = [float(self.burst), now, float('-inf')]
+            self.buckets[user_id] = bucket
+            if len(self.buckets) > self.max_users:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(user_id)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True, False
+
+        self.dropped += 1
+        if now - bucket[2] >= FLOOD_NOTICE_INTERVAL:
+            bucket[2] = now
+            self.notices += 1
+            return False, True
+        return False, False
+
+flood_control = FloodControl(FLOOD_RATE, FLOOD_BURST, FLOOD_TRACKED_USERS)
+
+async def flood_gate(update):
+    """Чи пропустити оновлення; викликається до постановки в чергу обробки"""
+    user = getattr(update, 'effective_user', None)
+    if user is None or is_admin(user.id):
+        return True
+
+    allowed, notify = flood_control.check(user.id, time.monotonic())
+    if allowed:
+        return True
+
+    if notify:
+        logger.info("Флуд від %s, відкинуто всього: %s", user.id, flood_control.dropped)
+        try:
+            if update.callback_query:
+                await update.callback_query.answer("⏳ Забагато запитів, зачекайте трохи")
+            elif update.effective_message:
+                await update.effective_message.reply_text("⏳ Забагато запитів, зачекайте трохи")
+        except TelegramError:
+            pass
+    return False
+
+# ============= ПРІОРИТЕТНА ОБРОБКА ОНОВЛЕНЬ =============
+
+PRIORITY_ADMIN, PRIORITY_REGISTRATION, PRIORITY_PUBLIC = range(3)
+PRIORITY_NAMES = ('Адміни', 'Реєстрація', 'Публічні')
+MAX_PENDING_UPDATES = 10000
+
+REGISTRATION_TIMEOUT = 30 * 60  # секунд без відповіді до скасування реєстрації
+
+# Користувачі, які зараз проходять /register: user_id -> час завершення пріоритету.
+# Термін однаковий для всіх, тож порядок вставки збігається з порядком завершення
+registering_users = OrderedDict()
+
+def mark_registering(user_id):
+    """Надати користувачу пріоритет реєстрації на REGISTRATION_TIMEOUT"""
+    registering_users.pop(user_id, None)
+    registering_users[user_id] = time.monotonic() + REGISTRATION_TIMEOUT
+
+def is_registering(user_id):
+    """Чи діє пріоритет реєстрації; прострочені записи видаляються"""
+    now = time.monotonic()
+    while registering_users:
+        expires = next(iter(registering_users.values()))
+        if expires > now:
+            break
+        registering_users.popitem(last=False)
+    return user_id in registering_users
+
+def classify_update(update):
+    """Клас пріоритету оновлення"""
+    user = getattr(update, 'effective_user', None)
+    if user is None:
+        return PRIORITY_PUBLIC
+    if is_admin(user.id):
+        return PRIORITY_ADMIN
+    if is_registering(user.id):
+        return PRIORITY_REGISTRATION
+    return PRIORITY_PUBLIC
+
+class PriorityUpdateProcessor(BaseUpdateProcessor):
+    """Обробка оновлень паралельно, але з пріоритетами.
+
+    Семафор базового класу лише обмежує кількість прийнятих оновлень, а
+    реальні слоти виконання (workers) видаються з купи за пріоритетом.
+    Оновлення одного користувача виконуються строго по черзі, а публічні
+    оновлення відкидаються, коли черга глибша за shed_depth.
+    """
+
+    def __init__(self, workers, shed_depth):
+        super().__init__(max_concurrent_updates=MAX_PENDING_UPDATES)
+        self.workers = workers
+        self.shed_depth = shed_depth
+        self._running = 0
+        self._waiting = []
+        self._seq = itertools.count()
+        self._user_locks = {}
+        self.queued = 0
+        self.shed = 0
+        # Затримка в черзі по класах: [кількість, сума, максимум]
+        self.latency = [[0, 0.0, 0.0] for _ in PRIORITY_NAMES]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def _acquire_slot(self, priority):
+        if self._running < self.workers and not self._waiting:
+            self._running += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот могли видати одночасно зі скасуванням - повертаємо його
+            if future.done() and not future.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self):
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                # Слот переходить наступному без зміни лічильника
+                future.set_result(None)
+                return
+        self._running -= 1
+
+    def _record_latency(self, priority, waited):
+        stats = self.latency[priority]
+        stats[0] += 1
+        stats[1] += waited
+        stats[2] = max(stats[2], waited)
+
+    async def do_process_update(self, update, coroutine):
+        # Флуд відсікається до черги, щоб не займати місце легітимних оновлень
+        if not await flood_gate(update):
+            coroutine.close()
+            return
+
+        priority = classify_update(update)
+
+        if priority == PRIORITY_PUBLIC and self.queued >= self.shed_depth:
+            self.shed += 1
+            coroutine.close()
+            return
+
+        user = getattr(update, 'effective_user', None)
+        key = user.id if user else None
+        lock = self._user_locks.get(key)
+        if lock is None:
+            lock = self._user_locks[key] = [asyncio.Lock(), 0]
+        lock[1] += 1
+
+        enqueued = time.monotonic()
+        self.queued += 1
+        waiting = True
+        try:
+            async with lock[0]:
+                await self._acquire_slot(priority)
+                self.queued -= 1
+                waiting = False
+                self._record_latency(priority, time.monotonic() - enqueued)
+                try:
+                    await coroutine
+                finally:
+                    self._release_slot()
+        finally:
+            if waiting:
+                # Скасовано ще в черзі (на замку користувача чи слоті) - обробник не запускався
+                self.queued -= 1
+                coroutine.close()
+            lock[1] -= 1
+            if not lock[1]:
+                del self._user_locks[key]
+
+    def report(self):
+        """Текстовий звіт про затримки черги"""
+        lines = [f"📥 У черзі: {self.queued}, відкинуто: {self.shed}"]
+        for name, (count, total, worst) in zip(PRIORITY_NAMES, self.latency):
+            average = total / count * 1000 if count else 0.0
+            lines.append(f"⏱ {name}: {count} шт, сер. {average:.0f} мс, макс. {worst * 1000:.0f} мс")
+        return "\n".join(lines)
+
+update_processor = PriorityUpdateProcessor(MAX_CONCURRENT_HANDLERS, SHED_QUEUE_DEPTH)
+
 # ============= ОСНОВНІ КОМАНДИ =============
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -210,11 +724,8 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ У вас немає доступу до адмін-панелі")
         return
 
-    await update.message.reply_text(
-        "🔧 АДМІН-ПАНЕЛЬ\n\n"
-        "Оберіть дію:",
-        reply_markup=get_admin_menu()
-    )
+    text, keyboard = get_screen('admin_menu')
+    await update.message.reply_text(text, reply_markup=keyboard)
 
 # ============= CALLBACK ОБРОБНИКИ =============
 
@@ -228,81 +739,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if data == 'back_to_main':
         await start(update, context)
 
-    elif data == 'register':
-        await query.message.edit_text(
-            "📝 РЕЄСТРАЦІЯ КОМАНДИ\n\n"
-            "Щоб зареєструвати команду, використайте команду:\n"
-            "/register\n\n"
-            "Бот проведе вас через весь процес реєстрації крок за кроком.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("◀️ Назад", callback_data='back_to_main')
-            ]])
-        )
-
-    elif data == 'info':
-        info_text = (
-            "ℹ️ ІНФОРМАЦІЯ ПРО ТУРНІР\n\n"
-            "📅 Дата: Листопад 2025\n"
-            "🎮 Гра: Counter-Strike 2\n"
-            "👥 Формат: 5 на 5\n"
-            "🇺🇦 Регіон: Україна\n"
-            "🔞 Вік: 16+\n\n"
-            "📍 Платформа: Online\n"
-            "🎯 Система: Single Elimination / Swiss\n"
-            "⏰ Час матчів: За розкладом\n\n"
-            "📢 Група турніру: " + GROUP_LINK
-        )
-        await query.message.edit_text(
-            info_text,
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("◀️ Назад", callback_data='back_to_main')
-            ]])
-        )
-
-    elif data == 'prizes':
-        prizes_text = (
-            "🏆 ПРИЗИ\n\n"
-            "💰 1 місце: $200\n"
-            "⭐ MVP турніру: $50\n\n"
-            "Загальний призовий фонд: $250\n\n"
-            "🎁 Додаткові призи:\n"
-            "• Унікальні ролі в Discord\n"
-            "• Фічер в соцмережах\n"
-            "• Запрошення на майбутні турніри\n\n"
-            "💳 Виплати через:\n"
-            "• Monobank\n"
-            "• PrivatBank\n"
-            "• USDT (TRC20)"
-        )
-        await query.message.edit_text(
-            prizes_text,
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("◀️ Назад", callback_data='back_to_main')
-            ]])
-        )
-
-    elif data == 'rules':
-        rules_text = (
-            "📋 ПРАВИЛА ТУРНІРУ\n\n"
-            "✅ Загальні правила:\n"
-            "• Офіційні правила CS2 Competitive\n"
-            "• Анті-чіт обов'язковий\n"
-            "• Заборонено використання читів\n"
-            "• Тайм-аути: 4 паузи по 30 сек\n\n"
-            "🎮 Налаштування:\n"
-            "• MR12 (12 раундів до зміни)\n"
-            "• Best of 1 (плей-офф: BO3)\n\n"
-            "⚠️ Штрафи:\n"
-            "• Запізнення 15+ хв = поразка\n"
-            "• Токсичність = дискваліфікація\n\n"
-            "📢 Повні правила: " + GROUP_LINK
-        )
-        await query.message.edit_text(
-            rules_text,
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("◀️ Назад", callback_data='back_to_main')
-            ]])
-        )
+    elif data in ('register', 'info', 'prizes', 'rules'):
+        text, keyboard = get_screen(data)
+        await query.message.edit_text(text, reply_markup=keyboard)
 
     # ============= АДМІН ФУНКЦІЇ =============
 
@@ -318,7 +757,12 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"📊 СТАТИСТИКА\n\n"
             f"👥 Підписників: {len(subscribers)}\n"
             f"🏆 Зареєстрованих команд: {len(registrations)}\n"
-            f"👤 Гравців: {len(registrations) * 5}\n"
+            f"👤 Гравців: {len(registrations) * 5}\n\n"
+            f"🚫 Відкинуто флуду: {flood_control.dropped}\n"
+            f"⏳ Попереджень: {flood_control.notices}\n\n"
+            f"{update_processor.report()}\n\n"
+            f"🔁 Повторів API: {api_request.retried}\n"
+            f"⛔ Відхилено breaker'ом: {api_request.rejected}\n"
         )
 
         await query.message.edit_text(stats_text, reply_markup=get_admin_menu())
@@ -348,89 +792,14 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             team_text = format_team_full(team, i)
             await query.message.reply_text(team_text)
 
-    elif data == 'admin_edit':
-        if not is_admin(query.from_user.id):
-            await query.message.edit_text("❌ Немає доступу")
-            return
-
-        registrations = load_data(REGISTRATIONS_FILE)
-
-        if not registrations:
-            await query.message.edit_text(
-                "📋 Немає команд для редагування",
-                reply_markup=get_admin_menu()
-            )
-            return
-
-        keyboard = []
-        for i, team in enumerate(registrations):
-            keyboard.append([InlineKeyboardButton(
-                f"{i+1}. {team['team_name']} [{team['team_tag']}]",
-                callback_data=f'edit_team_{i}'
-            )])
-        keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data='back_to_admin')])
-
-        await query.message.edit_text(
-            "✏️ Оберіть команду для редагування:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
-
-    elif data.startswith('edit_team_'):
-        team_index = int(data.split('_')[2])
-        context.user_data['editing_team_index'] = team_index
-        team = get_team_by_index(team_index)
-
-        if not team:
-            await query.message.edit_text("❌ Команду не знайдено", reply_markup=get_admin_menu())
-            return
-
-        keyboard = [
-            [InlineKeyboardButton("Назва команди", callback_data='edit_field_team_name')],
-            [InlineKeyboardButton("Тег команди", callback_data='edit_field_team_tag')],
-            [InlineKeyboardButton("Капітан - нік", callback_data='edit_field_cap_nick')],
-            [InlineKeyboardButton("Капітан - ім'я", callback_data='edit_field_cap_name')],
-            [InlineKeyboardButton("Капітан - вік", callback_data='edit_field_cap_age')],
-            [InlineKeyboardButton("Капітан - Steam ID", callback_data='edit_field_cap_steam')],
-            [InlineKeyboardButton("Капітан - Discord", callback_data='edit_field_cap_discord')],
-            [InlineKeyboardButton("Капітан - Telegram", callback_data='edit_field_cap_tg')],
-            [InlineKeyboardButton("◀️ Назад", callback_data='admin_edit')],
-        ]
-
-        await query.message.edit_text(
-            f"✏️ Редагування команди:\n{team['team_name']} [{team['team_tag']}]\n\n"
-            f"Оберіть поле для зміни:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
-
-    elif data.startswith('edit_field_'):
-        field = data.replace('edit_field_', '')
-        context.user_data['editing_field'] = field
-
-        field_names = {
-            'team_name': 'Назву команди',
-            'team_tag': 'Тег команди',
-            'cap_nick': 'Нікнейм капітана',
-            'cap_name': "Ім'я капітана",
-            'cap_age': 'Вік капітана',
-            'cap_steam': 'Steam ID капітана',
-            'cap_discord': 'Discord капітана',
-            'cap_tg': 'Telegram капітана',
-        }
-
-        await query.message.edit_text(
-            f"✏️ Введіть нове значення для поля:\n"
-            f"📝 {field_names.get(field, field)}\n\n"
-            f"Відправте нове значення текстовим повідомленням."
-        )
-
     elif data == 'admin_delete':
         if not is_admin(query.from_user.id):
             await query.message.edit_text("❌ Немає доступу")
             return
 
-        registrations = load_data(REGISTRATIONS_FILE)
+        labels = team_labels()
 
-        if not registrations:
+        if not labels:
             await query.message.edit_text(
                 "📋 Немає команд для видалення",
                 reply_markup=get_admin_menu()
@@ -438,9 +807,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         keyboard = []
-        for i, team in enumerate(registrations):
+        for i, (name, tag) in enumerate(labels):
             keyboard.append([InlineKeyboardButton(
-                f"🗑 {i+1}. {team['team_name']} [{team['team_tag']}]",
+                f"🗑 {i+1}. {name} [{tag}]",
                 callback_data=f'delete_team_{i}'
             )])
         keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data='back_to_admin')])
@@ -466,113 +835,271 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 reply_markup=get_admin_menu()
             )
 
-    elif data == 'back_to_admin':
-        await query.message.edit_text(
-            "🔧 АДМІН-ПАНЕЛЬ\n\nОберіть дію:",
-            reply_markup=get_admin_menu()
-        )
-
-    elif data == 'admin_broadcast':
+    elif data.startswith('report_ok_') or data.startswith('report_no_'):
         if not is_admin(query.from_user.id):
             await query.message.edit_text("❌ Немає доступу")
             return
 
-        await query.message.edit_text(
-            "📢 РОЗСИЛКА\n\n"
-            "Використайте команду:\n"
-            "/broadcast ваше повідомлення\n\n"
-            "Повідомлення буде відправлено всім підписникам.",
-            reply_markup=get_admin_menu()
-        )
+        # Кнопки, надіслані до появи nonce, містять лише ідентифікатор матчу
+        match_id, _, nonce = data[len('report_ok_'):].partition('_')
+        await review_report(query, context, match_id, nonce, data.startswith('report_ok_'))
+
+    elif data == 'back_to_admin':
+        text, keyboard = get_screen('admin_menu')
+        await query.message.edit_text(text, reply_markup=keyboard)
 
-    elif data == 'admin_giveaway':
+    elif data in ('admin_broadcast', 'admin_giveaway'):
         if not is_admin(query.from_user.id):
             await query.message.edit_text("❌ Немає доступу")
             return
 
-        await query.message.edit_text(
-            "🎁 РОЗІГРАШ\n\n"
-            "Використайте команду:\n"
-            "/giveaway\n\n"
-            "Буде обрано випадкового переможця.",
-            reply_markup=get_admin_menu()
+        text, keyboard = get_screen(data)
+        await query.message.edit_text(text, reply_markup=keyboard)
+
+# ============= РЕДАГУВАННЯ КОМАНДИ =============
+
+EDIT_TIMEOUT = 15 * 60  # секунд бездіяльності до скасування сесії редагування
+
+# Поля, доступні для редагування, у порядку показу
+EDIT_FIELDS = OrderedDict([
+    ('team_name', 'Назва команди'),
+    ('team_tag', 'Тег команди'),
+    ('cap_nick', 'Капітан - нік'),
+    ('cap_name', "Капітан - ім'я"),
+    ('cap_age', 'Капітан - вік'),
+    ('cap_steam', 'Капітан - Steam ID'),
+    ('cap_discord', 'Капітан - Discord'),
+    ('cap_tg', 'Капітан - Telegram'),
+])
+for _n in range(2, 6):
+    EDIT_FIELDS[f'p{_n}_nick'] = f'Гравець {_n} - нік'
+    EDIT_FIELDS[f'p{_n}_name'] = f"Гравець {_n} - ім'я"
+    EDIT_FIELDS[f'p{_n}_age'] = f'Гравець {_n} - вік'
+    EDIT_FIELDS[f'p{_n}_steam'] = f'Гравець {_n} - Steam ID'
+EDIT_FIELDS['comments'] = 'Коментарі'
+
+def team_identity(team):
+    """Незмінний ідентифікатор команди (індекс зсувається після видалень)"""
+    return (team.get('user_id'), team.get('timestamp'))
+
+def format_edit_diff(session):
+    """Список змін у сесії редагування"""
+    original = session['original']
+    lines = [
+        f"• {EDIT_FIELDS[field]}: {original.get(field, '—')} → {value}"
+        for field, value in session['changes'].items()
+    ]
+    return "\n".join(lines) if lines else "Змін немає"
+
+def edit_fields_keyboard(session):
+    """Клавіатура вибору поля (змінені поля позначені ✏️)"""
+    buttons = [
+        InlineKeyboardButton(
+            f"{'✏️ ' if field in session['changes'] else ''}{label}",
+            callback_data=f'edit_field_{field}'
         )
+        for field, label in EDIT_FIELDS.items()
+    ]
+    keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    keyboard.append([
+        InlineKeyboardButton(f"💾 Зберегти ({len(session['changes'])})", callback_data='edit_commit'),
+        InlineKeyboardButton("❌ Скасувати", callback_data='edit_discard'),
+    ])
+    return InlineKeyboardMarkup(keyboard)
 
-# ============= ОБРОБНИК РЕДАГУВАННЯ =============
+def edit_session_text(session):
+    original = session['original']
+    return (
+        f"✏️ Редагування команди:\n{original['team_name']} [{original['team_tag']}]\n\n"
+        f"Зміни:\n{format_edit_diff(session)}\n\n"
+        f"Оберіть поле для зміни або збережіть:"
+    )
 
-async def handle_edit_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обробка введення нового значення при редагуванні"""
-    if 'editing_team_index' not in context.user_data or 'editing_field' not in context.user_data:
-        return
+async def edit_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Вибір команди для редагування"""
+    query = update.callback_query
+    await query.answer()
 
-    if not is_admin(update.effective_user.id):
-        return
+    if not is_admin(query.from_user.id):
+        await query.message.edit_text("❌ Немає доступу")
+        return ConversationHandler.END
 
-    team_index = context.user_data['editing_team_index']
-    field = context.user_data['editing_field']
-    new_value = update.message.text
+    labels = team_labels()
 
-    # Валідація
-    if field == 'cap_steam' and not validate_steam_id(new_value):
-        await update.message.reply_text(
-            "❌ Steam ID має містити тільки цифри (мінімум 8)\n"
-            "Спробуйте ще раз:"
+    if not labels:
+        await query.message.edit_text(
+            "📋 Немає команд для редагування",
+            reply_markup=get_admin_menu()
         )
-        return
+        return ConversationHandler.END
 
-    if field == 'cap_age':
-        try:
-            age = int(new_value)
-            if age < 16:
-                await update.message.reply_text("❌ Вік має бути від 16 років. Спробуйте ще раз:")
-                return
-        except ValueError:
-            await update.message.reply_text("❌ Введіть число. Спробуйте ще раз:")
-            return
+    keyboard = []
+    for i, (name, tag) in enumerate(labels):
+        keyboard.append([InlineKeyboardButton(
+            f"{i+1}. {name} [{tag}]",
+            callback_data=f'edit_team_{i}'
+        )])
+    keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data='back_to_admin')])
+
+    await query.message.edit_text(
+        "✏️ Оберіть команду для редагування:",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return EDIT_SELECT_TEAM
+
+async def edit_select_team(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Початок сесії редагування команди"""
+    query = update.callback_query
+    await query.answer()
 
-    # Оновлення
+    team_index = int(query.data.split('_')[2])
     team = get_team_by_index(team_index)
-    if team:
-        team[field] = new_value
-        if update_team(team_index, team):
-            await update.message.reply_text(
-                f"✅ Поле оновлено!\n\n"
-                f"Команда: {team['team_name']}\n"
-                f"Поле: {field}\n"
-                f"Нове значення: {new_value}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("◀️ До адмін-панелі", callback_data='back_to_admin')
-                ]])
-            )
-        else:
-            await update.message.reply_text("❌ Помилка оновлення")
 
-    # Очищення
-    context.user_data.pop('editing_team_index', None)
-    context.user_data.pop('editing_field', None)
+    if not team:
+        await query.message.edit_text("❌ Команду не знайдено", reply_markup=get_admin_menu())
+        return ConversationHandler.END
 
-# ============= РЕЄСТРАЦІЯ КОМАНДИ =============
+    session = {'index': team_index, 'original': team, 'changes': {}}
+    context.user_data['edit_session'] = session
 
-async def register_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Початок реєстрації"""
-    await update.message.reply_text(
-        "📝 РЕЄСТРАЦІЯ КОМАНДИ\n\n"
-        "Я буду ставити запитання, а ви відповідайте.\n"
-        "Для скасування: /cancel\n\n"
-        "Введіть назву команди:"
-    )
-    return TEAM_NAME
+    await query.message.edit_text(edit_session_text(session), reply_markup=edit_fields_keyboard(session))
+    return EDIT_SELECT_FIELD
 
-async def team_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data['team_name'] = update.message.text
-    await update.message.reply_text(f"✅ Команда: {update.message.text}\n\nВведіть тег (2-5 символів):")
-    return TEAM_TAG
+async def edit_session_lost(respond):
+    """Сесії редагування вже немає (скасована або очищена) - просимо почати знову"""
+    await respond("❌ Сесію редагування втрачено. Почніть знову.", reply_markup=get_admin_menu())
+    return ConversationHandler.END
 
-async def team_tag(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    tag = update.message.text.upper()
-    if len(tag) < 2 or len(tag) > 5:
-        await update.message.reply_text("❌ Тег має бути 2-5 символів:")
-        return TEAM_TAG
+async def edit_select_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Запит нового значення поля"""
+    query = update.callback_query
+    await query.answer()
+
+    field = query.data.replace('edit_field_', '')
+    session = context.user_data.get('edit_session')
+    if session is None:
+        return await edit_session_lost(query.message.edit_text)
+    session['field'] = field
+    current = session['changes'].get(field, session['original'].get(field, '—'))
+
+    await query.message.edit_text(
+        f"✏️ Введіть нове значення для поля:\n"
+        f"📝 {EDIT_FIELDS[field]}\n"
+        f"Поточне: {current}\n\n"
+        f"Відправте нове значення текстовим повідомленням."
+    )
+    return EDIT_INPUT_VALUE
+
+async def edit_input_value(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Перевірка та додавання зміни до сесії (без запису у файл)"""
+    session = context.user_data.get('edit_session')
+    if session is None:
+        return await edit_session_lost(update.message.reply_text)
+    field = session['field']
+
+    value, error = validate_field(field, update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}\nСпробуйте ще раз:")
+        return EDIT_INPUT_VALUE
+
+    if value == session['original'].get(field):
+        session['changes'].pop(field, None)
+    else:
+        session['changes'][field] = value
+
+    await update.message.reply_text(edit_session_text(session), reply_markup=edit_fields_keyboard(session))
+    return EDIT_SELECT_FIELD
+
+async def edit_commit(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Записати всі зміни сесії одним атомарним записом"""
+    query = update.callback_query
+    await query.answer()
+
+    session = context.user_data.pop('edit_session', None)
+    if session is None:
+        return await edit_session_lost(query.message.edit_text)
+    if not session['changes']:
+        await query.message.edit_text("ℹ️ Змін немає", reply_markup=get_admin_menu())
+        return ConversationHandler.END
+
+    registrations = load_data(REGISTRATIONS_FILE)
+    index = session['index']
+    original = session['original']
+
+    # Команду могли змінити або видалити, поки тривала сесія
+    if (not 0 <= index < len(registrations)
+            or team_identity(registrations[index]) != team_identity(original)
+            or registrations[index].get('version', 0) != original.get('version', 0)):
+        await query.message.edit_text(
+            "❌ Команду змінено або видалено іншим адміністратором. Зміни не збережено.",
+            reply_markup=get_admin_menu()
+        )
+        return ConversationHandler.END
+
+    team = registrations[index]
+    team.update(session['changes'])
+    team['version'] = team.get('version', 0) + 1
+    save_data(REGISTRATIONS_FILE, registrations)
+
+    await query.message.edit_text(
+        f"✅ Зміни збережено!\n\n"
+        f"Команда: {team['team_name']} [{team['team_tag']}]\n\n"
+        f"{format_edit_diff(session)}",
+        reply_markup=get_screen('edit_done')[1]
+    )
+    return ConversationHandler.END
+
+async def edit_discard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Скасувати сесію редагування"""
+    query = update.callback_query
+    await query.answer()
+    context.user_data.pop('edit_session', None)
+
+    text, keyboard = get_screen('admin_menu')
+    await query.message.edit_text(text, reply_markup=keyboard)
+    return ConversationHandler.END
+
+async def edit_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Скасувати сесію редагування командою /cancel"""
+    context.user_data.pop('edit_session', None)
+    await update.message.reply_text("❌ Редагування скасовано.", reply_markup=get_admin_menu())
+    return ConversationHandler.END
+
+async def edit_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Сесію редагування покинуто - незбережені зміни відкидаються"""
+    context.user_data.pop('edit_session', None)
+
+# ============= РЕЄСТРАЦІЯ КОМАНДИ =============
+
+# Поля анкети; user_data спільний з сесією редагування, тож у файл пишемо лише їх
+REGISTRATION_FIELDS = list(EDIT_FIELDS)
+
+def clear_registration(user_data):
+    """Прибрати відповіді анкети, не чіпаючи інших даних користувача"""
+    for field in REGISTRATION_FIELDS:
+        user_data.pop(field, None)
+
+async def register_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Початок реєстрації"""
+    mark_registering(update.effective_user.id)
+    await update.message.reply_text(
+        "📝 РЕЄСТРАЦІЯ КОМАНДИ\n\n"
+        "Я буду ставити запитання, а ви відповідайте.\n"
+        "Для скасування: /cancel\n\n"
+        "Введіть назву команди:"
+    )
+    return TEAM_NAME
+
+async def team_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data['team_name'] = update.message.text
+    await update.message.reply_text(f"✅ Команда: {update.message.text}\n\nВведіть тег (2-5 символів):")
+    return TEAM_TAG
+
+async def team_tag(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    tag, error = validate_field('team_tag', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}:")
+        return TEAM_TAG
 
     context.user_data['team_tag'] = tag
     await update.message.reply_text(f"✅ Тег: [{tag}]\n\n👑 КАПІТАН\n\nНікнейм (Steam):")
@@ -589,25 +1116,19 @@ async def captain_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return CAP_AGE
 
 async def captain_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        age = int(update.message.text)
-        if age < 16:
-            await update.message.reply_text("❌ Вік від 16 років:")
-            return CAP_AGE
-        context.user_data['cap_age'] = age
-        await update.message.reply_text("Steam ID (тільки цифри, мінімум 8):")
-        return CAP_STEAM
-    except ValueError:
-        await update.message.reply_text("❌ Введіть число:")
+    age, error = validate_field('cap_age', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}:")
         return CAP_AGE
 
+    context.user_data['cap_age'] = age
+    await update.message.reply_text("Steam ID (тільки цифри, мінімум 8):")
+    return CAP_STEAM
+
 async def captain_steam(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    steam_id = update.message.text
-    if not validate_steam_id(steam_id):
-        await update.message.reply_text(
-            "❌ Steam ID має містити тільки цифри (мінімум 8)\n"
-            "Спробуйте ще раз:"
-        )
+    steam_id, error = validate_field('cap_steam', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}\nСпробуйте ще раз:")
         return CAP_STEAM
 
     context.user_data['cap_steam'] = steam_id
@@ -636,22 +1157,19 @@ async def player2_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return P2_AGE
 
 async def player2_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        age = int(update.message.text)
-        if age < 16:
-            await update.message.reply_text("❌ Вік від 16:")
-            return P2_AGE
-        context.user_data['p2_age'] = age
-        await update.message.reply_text("Steam ID (тільки цифри):")
-        return P2_STEAM
-    except ValueError:
-        await update.message.reply_text("❌ Введіть число:")
+    age, error = validate_field('p2_age', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}:")
         return P2_AGE
 
+    context.user_data['p2_age'] = age
+    await update.message.reply_text("Steam ID (тільки цифри):")
+    return P2_STEAM
+
 async def player2_steam(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    steam_id = update.message.text
-    if not validate_steam_id(steam_id):
-        await update.message.reply_text("❌ Steam ID - тільки цифри (мінімум 8):")
+    steam_id, error = validate_field('p2_steam', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}\nСпробуйте ще раз:")
         return P2_STEAM
 
     context.user_data['p2_steam'] = steam_id
@@ -669,22 +1187,19 @@ async def player3_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return P3_AGE
 
 async def player3_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        age = int(update.message.text)
-        if age < 16:
-            await update.message.reply_text("❌ Вік від 16:")
-            return P3_AGE
-        context.user_data['p3_age'] = age
-        await update.message.reply_text("Steam ID (тільки цифри):")
-        return P3_STEAM
-    except ValueError:
-        await update.message.reply_text("❌ Введіть число:")
+    age, error = validate_field('p3_age', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}:")
         return P3_AGE
 
+    context.user_data['p3_age'] = age
+    await update.message.reply_text("Steam ID (тільки цифри):")
+    return P3_STEAM
+
 async def player3_steam(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    steam_id = update.message.text
-    if not validate_steam_id(steam_id):
-        await update.message.reply_text("❌ Steam ID - тільки цифри (мінімум 8):")
+    steam_id, error = validate_field('p3_steam', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}\nСпробуйте ще раз:")
         return P3_STEAM
 
     context.user_data['p3_steam'] = steam_id
@@ -702,22 +1217,19 @@ async def player4_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return P4_AGE
 
 async def player4_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        age = int(update.message.text)
-        if age < 16:
-            await update.message.reply_text("❌ Вік від 16:")
-            return P4_AGE
-        context.user_data['p4_age'] = age
-        await update.message.reply_text("Steam ID (тільки цифри):")
-        return P4_STEAM
-    except ValueError:
-        await update.message.reply_text("❌ Введіть число:")
+    age, error = validate_field('p4_age', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}:")
         return P4_AGE
 
+    context.user_data['p4_age'] = age
+    await update.message.reply_text("Steam ID (тільки цифри):")
+    return P4_STEAM
+
 async def player4_steam(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    steam_id = update.message.text
-    if not validate_steam_id(steam_id):
-        await update.message.reply_text("❌ Steam ID - тільки цифри (мінімум 8):")
+    steam_id, error = validate_field('p4_steam', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}\nСпробуйте ще раз:")
         return P4_STEAM
 
     context.user_data['p4_steam'] = steam_id
@@ -735,22 +1247,19 @@ async def player5_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return P5_AGE
 
 async def player5_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        age = int(update.message.text)
-        if age < 16:
-            await update.message.reply_text("❌ Вік від 16:")
-            return P5_AGE
-        context.user_data['p5_age'] = age
-        await update.message.reply_text("Steam ID (тільки цифри):")
-        return P5_STEAM
-    except ValueError:
-        await update.message.reply_text("❌ Введіть число:")
+    age, error = validate_field('p5_age', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}:")
         return P5_AGE
 
+    context.user_data['p5_age'] = age
+    await update.message.reply_text("Steam ID (тільки цифри):")
+    return P5_STEAM
+
 async def player5_steam(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    steam_id = update.message.text
-    if not validate_steam_id(steam_id):
-        await update.message.reply_text("❌ Steam ID - тільки цифри (мінімум 8):")
+    steam_id, error = validate_field('p5_steam', update.message.text)
+    if error:
+        await update.message.reply_text(f"{error}\nСпробуйте ще раз:")
         return P5_STEAM
 
     context.user_data['p5_steam'] = steam_id
@@ -788,9 +1297,10 @@ async def comments(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     choice = update.message.text
+    registering_users.pop(update.effective_user.id, None)
 
     if '✅' in choice:
-        data = context.user_data
+        data = {field: context.user_data[field] for field in REGISTRATION_FIELDS}
         data['timestamp'] = datetime.now().isoformat()
         data['user_id'] = update.effective_user.id
 
@@ -807,8 +1317,8 @@ async def confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     chat_id=admin_id,
                     text=f"🆕 НОВА КОМАНДА!\n\n{admin_msg}"
                 )
-            except:
-                pass
+            except TelegramError as e:
+                logger.warning("Не вдалося сповістити адміна %s: %s", admin_id, e)
 
         await update.message.reply_text(
             "✅ Реєстрацію завершено!\n\n"
@@ -816,97 +1326,1294 @@ async def confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"Приєднуйтесь: {GROUP_LINK}",
             reply_markup=ReplyKeyboardRemove()
         )
-        context.user_data.clear()
+        clear_registration(context.user_data)
         return ConversationHandler.END
     else:
         await update.message.reply_text(
             "❌ Скасовано. Для нової реєстрації: /register",
             reply_markup=ReplyKeyboardRemove()
         )
-        context.user_data.clear()
+        clear_registration(context.user_data)
         return ConversationHandler.END
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    registering_users.pop(update.effective_user.id, None)
     await update.message.reply_text("❌ Скасовано.", reply_markup=ReplyKeyboardRemove())
-    context.user_data.clear()
+    clear_registration(context.user_data)
     return ConversationHandler.END
 
-# ============= АДМІН ФУНКЦІЇ =============
+async def registration_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Реєстрацію покинуто - звільняємо пріоритет і дані"""
+    registering_users.pop(update.effective_user.id, None)
+    clear_registration(context.user_data)
+    try:
+        await update.effective_message.reply_text(
+            "⌛ Час реєстрації вичерпано. Для нової реєстрації: /register",
+            reply_markup=ReplyKeyboardRemove()
+        )
+    except TelegramError:
+        pass
 
-async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Розсилка повідомлення"""
-    if not is_admin(update.effective_user.id):
-        await update.message.reply_text("❌ Немає доступу")
-        return
+# ============= АУДИТОРІЇ РОЗСИЛКИ =============
 
-    if not context.args:
-        await update.message.reply_text("Використання: /broadcast ваше повідомлення")
-        return
+SEGMENTS_HELP = "all, captains, unregistered, round:S<N>, round:P<N>"
 
-    message = ' '.join(context.args)
-    subscribers = load_data(SUBSCRIBERS_FILE)
+def data_version(filename):
+    """(шлях, mtime, розмір) файлу, з якого читаються дані"""
+    path = filename
+    if uses_snapshot(filename) and os.path.exists(snapshot_path(filename)):
+        path = snapshot_path(filename)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (path, None, None)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+class AudienceIndex:
+    """Індекси отримувачів розсилки, що перебудовуються лише при зміні файлів"""
+
+    def __init__(self):
+        self.version = None
+        self.subscribers = []
+        self.captains = set()
+        self.rounds = {}
 
+    def refresh(self):
+        version = tuple(data_version(f) for f in (SUBSCRIBERS_FILE, REGISTRATIONS_FILE, BRACKET_FILE))
+        if version == self.version:
+            return
+
+        self.subscribers = load_data(SUBSCRIBERS_FILE)
+        self.captains = set(registered_user_ids())
+
+        # Раунд (S1, P2, ...) -> user_id капітанів команд, що в ньому грають
+        self.rounds = {}
+        state = load_bracket()
+        if state:
+            stages = [('S', state['swiss']['rounds'])]
+            if state.get('playoff'):
+                stages.append(('P', state['playoff']['rounds']))
+            for prefix, rounds in stages:
+                for number, round_matches in enumerate(rounds, 1):
+                    members = {}
+                    for match in round_matches:
+                        for team_id in (match['a'], match['b']):
+                            if team_id is not None:
+                                user_id = state['entrants'][team_id]['user_id']
+                                if user_id is not None:
+                                    members[user_id] = None
+                    self.rounds[f'{prefix}{number}'] = list(members)
+
+        self.version = version
+
+    def segment(self, name):
+        """Ітератор user_id сегмента або None для невідомого сегмента"""
+        self.refresh()
+        if name == 'all':
+            return iter(self.subscribers)
+        if name == 'captains':
+            return iter(sorted(self.captains))
+        if name == 'unregistered':
+            captains = self.captains
+            return (user_id for user_id in self.subscribers if user_id not in captains)
+        if name.startswith('round:'):
+            members = self.rounds.get(name.split(':', 1)[1].upper())
+            return iter(members) if members is not None else None
+        return None
+
+audience_index = AudienceIndex()
+
+# ============= АДМІН ФУНКЦІЇ =============
+
+async def send_broadcast(bot, recipients, text):
+    """Надіслати текст отримувачам з ітератора; повертає (успішно, помилок, перервано)"""
     success = 0
     failed = 0
 
-    for user_id in subscribers:
+    for user_id in recipients:
         try:
-            await context.bot.send_message(chat_id=user_id, text=f"📢 {message}")
+            await bot.send_message(chat_id=user_id, text=text)
             success += 1
-        except:
+        except ApiUnavailable:
+            return success, failed, True
+        except TelegramError:
             failed += 1
 
+    return success, failed, False
+
+def parse_segment_args(args):
+    """Виділити --segment з аргументів: (сегмент, решта слів)"""
+    if args and args[0].startswith('--segment='):
+        return args[0].split('=', 1)[1], args[1:]
+    if len(args) > 1 and args[0] == '--segment':
+        return args[1], args[2:]
+    return 'all', args
+
+async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Розсилка повідомлення: /broadcast [--segment <сегмент>] текст"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Немає доступу")
+        return
+
+    segment, words = parse_segment_args(context.args or [])
+
+    if not words:
+        await update.message.reply_text(
+            "Використання: /broadcast [--segment <сегмент>] ваше повідомлення\n\n"
+            f"Сегменти: {SEGMENTS_HELP}"
+        )
+        return
+
+    recipients = audience_index.segment(segment)
+    if recipients is None:
+        await update.message.reply_text(f"❌ Невідомий сегмент: {segment}\n\nСегменти: {SEGMENTS_HELP}")
+        return
+
+    message = ' '.join(words)
+    success, failed, aborted = await send_broadcast(context.bot, recipients, f"📢 {message}")
+
     await update.message.reply_text(
-        f"✅ Розсилка завершена\n\n"
+        f"{'⚠️ Розсилку перервано: API недоступний' if aborted else '✅ Розсилка завершена'}\n\n"
+        f"Сегмент: {segment}\n"
         f"Успішно: {success}\n"
         f"Помилок: {failed}"
     )
 
+MESSAGE_LIMIT = 4000  # з запасом до ліміту Telegram у 4096 символів
+
+def split_message(lines, limit=MESSAGE_LIMIT):
+    """Розбити рядки на повідомлення, що вміщаються в ліміт Telegram"""
+    chunk = []
+    size = 0
+    for line in lines:
+        if chunk and size + len(line) + 1 > limit:
+            yield "\n".join(chunk)
+            chunk = []
+            size = 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        yield "\n".join(chunk)
+
+# ============= РОЗІГРАШ =============
+
+GIVEAWAY_BATCH_SIZE = 20  # одночасних запитів до API, щоб не вичерпати пул з'єднань
+
+def registered_user_ids():
+    """Відсортований список user_id капітанів зареєстрованих команд"""
+    return sorted({team['user_id'] for team in load_data(REGISTRATIONS_FILE) if 'user_id' in team})
+
+def pool_digest(pool):
+    """SHA-256 від складу пулу учасників (для аудиту розіграшу)"""
+    digest = hashlib.sha256()
+    for user_id in pool:
+        digest.update(f"{user_id}\n".encode())
+    return digest.hexdigest()
+
+class FairDraw:
+    """Відтворюваний жереб на основі секретного seed.
+
+    Seed генерується через secrets, а до жеребкування оголошується лише
+    його SHA-256 (commitment). Індекси обираються як HMAC-SHA256(seed, лічильник)
+    з відкиданням значень, що дають зміщення за модулем, тож після розкриття
+    seed будь-хто може повторити жеребкування по тому ж пулу.
+    """
+
+    def __init__(self, pool_size, seed=None):
+        self.seed = seed if seed is not None else secrets.token_bytes(32)
+        self.commitment = hashlib.sha256(self.seed).hexdigest()
+        self.pool_size = pool_size
+        self.counter = 0
+        self.drawn = set()
+
+    def _next_index(self):
+        limit = 2 ** 64 - (2 ** 64 % self.pool_size)
+        while True:
+            digest = hmac.new(self.seed, self.counter.to_bytes(8, 'big'), hashlib.sha256).digest()
+            self.counter += 1
+            value = int.from_bytes(digest[:8], 'big')
+            if value < limit:
+                return value % self.pool_size
+
+    def draw(self):
+        """Наступний ще не обраний індекс пулу або None, якщо пул вичерпано"""
+        if len(self.drawn) >= self.pool_size:
+            return None
+        while True:
+            index = self._next_index()
+            if index not in self.drawn:
+                self.drawn.add(index)
+                return index
+
+async def resolve_winners(bot, pool, draw, count):
+    """Обрати count досяжних переможців, перетягуючи жереб замість недоступних.
+
+    Повертає (переможці, витягнуті id, недоступні id, перервано).
+    """
+    winners = []
+    drawn_ids = []
+    unreachable = []
+    aborted = False
+
+    while len(winners) < count:
+        batch = []
+        for _ in range(min(count - len(winners), GIVEAWAY_BATCH_SIZE)):
+            index = draw.draw()
+            if index is None:
+                break
+            batch.append(pool[index])
+        if not batch:
+            break
+
+        drawn_ids.extend(batch)
+        results = await asyncio.gather(
+            *(bot.get_chat(user_id) for user_id in batch),
+            return_exceptions=True
+        )
+        for user_id, result in zip(batch, results):
+            if isinstance(result, ApiUnavailable):
+                # API лежить - не перетягуємо весь пул, а зупиняємось
+                aborted = True
+            elif isinstance(result, TelegramError):
+                logger.warning("Розіграш: користувач %s недоступний (%s)", user_id, result)
+                unreachable.append(user_id)
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                winners.append(result)
+        if aborted:
+            break
+
+    return winners, drawn_ids, unreachable, aborted
+
+def log_giveaway(entry):
+    """Додати запис про розіграш до журналу аудиту"""
+    history = load_data(GIVEAWAYS_FILE)
+    history.append(entry)
+    save_data(GIVEAWAYS_FILE, history)
+
 async def giveaway(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Випадковий розіграш"""
+    """Розіграш: /giveaway [N] [registered_only]"""
     if not is_admin(update.effective_user.id):
         await update.message.reply_text("❌ Немає доступу")
         return
 
-    subscribers = load_data(SUBSCRIBERS_FILE)
+    args = context.args or []
+    try:
+        count = int(args[0]) if args else 1
+    except ValueError:
+        count = 0
+    registered_only = len(args) > 1 and args[1] == 'registered_only'
 
-    if not subscribers:
-        await update.message.reply_text("❌ Немає підписників")
+    if count < 1 or (len(args) > 1 and not registered_only) or len(args) > 2:
+        await update.message.reply_text("Використання: /giveaway [кількість] [registered_only]")
         return
 
-    import random
-    winner_id = random.choice(subscribers)
+    pool = registered_user_ids() if registered_only else load_data(SUBSCRIBERS_FILE)
 
-    try:
-        winner = await context.bot.get_chat(winner_id)
-        winner_name = winner.first_name
-        winner_username = winner.username
-
-        # Формування повідомлення
-        winner_info = f"👤 {winner_name}"
-        if winner_username:
-            winner_info += f"\n📱 @{winner_username}"
+    if not pool:
+        await update.message.reply_text(
+            "❌ Немає зареєстрованих команд" if registered_only else "❌ Немає підписників"
+        )
+        return
+
+    count = min(count, len(pool))
+    draw = FairDraw(len(pool))
+    digest = pool_digest(pool)
+    logger.info("Розіграш: commitment=%s pool=%s digest=%s", draw.commitment, len(pool), digest)
+
+    # Commitment оголошується до жеребкування
+    await update.message.reply_text(
+        f"🎲 Розіграш {count} призів серед {len(pool)} учасників\n\n"
+        f"🔐 Commitment: {draw.commitment}"
+    )
+
+    winners, drawn_ids, unreachable, aborted = await resolve_winners(context.bot, pool, draw, count)
+
+    log_giveaway({
+        'timestamp': datetime.now().isoformat(),
+        'admin_id': update.effective_user.id,
+        'count': count,
+        'registered_only': registered_only,
+        'pool_size': len(pool),
+        'pool_digest': digest,
+        'commitment': draw.commitment,
+        'seed': draw.seed.hex(),
+        'drawn': drawn_ids,
+        'unreachable': unreachable,
+        'winners': [winner.id for winner in winners],
+        'aborted': aborted,
+    })
+
+    # Переможців сповіщаємо першими - вони вже записані в журнал
+    for offset in range(0, len(winners), GIVEAWAY_BATCH_SIZE):
+        await asyncio.gather(
+            *(context.bot.send_message(
+                chat_id=winner.id,
+                text="🎉 Вітаємо! Ви виграли розіграш! Організатори зв'яжуться з вами."
+            ) for winner in winners[offset:offset + GIVEAWAY_BATCH_SIZE]),
+            return_exceptions=True
+        )
+
+    if aborted:
+        # Seed оголошуємо і тут, щоб commitment можна було перевірити
+        await update.message.reply_text(
+            f"⚠️ Розіграш перервано: Telegram API недоступний\n\n"
+            f"Встигли обрати: {len(winners)} з {count}\n"
+            f"🔑 Seed: {draw.seed.hex()}"
+        )
+        if not winners:
+            return
+    elif not winners:
+        await update.message.reply_text("❌ Не вдалося зв'язатися з жодним учасником")
+        return
+
+    lines = ["🎁 Переможці розіграшу:", ""]
+    for i, winner in enumerate(winners, 1):
+        if winner.username:
+            lines.append(f"{i}. 👤 {winner.first_name} 📱 @{winner.username}")
+        else:
+            lines.append(f"{i}. 👤 {winner.first_name} 🆔 ID: {winner.id}")
+    lines += [
+        "",
+        f"🔑 Seed: {draw.seed.hex()}",
+        f"♻️ Перетягнуто (недоступні): {len(unreachable)}",
+    ]
+
+    for page in split_message(lines):
+        await update.message.reply_text(page)
+
+# ============= СІТКА ТУРНІРУ =============
+
+SCORE_PATTERN = re.compile(r'^(\d{1,2})[:\-](\d{1,2})$')
+
+# Відрендерена турнірна таблиця, скидається в save_bracket
+_standings_pages = []
+
+def load_bracket():
+    """Завантажити стан сітки (None, якщо турнір ще не розпочато)"""
+    return load_data(BRACKET_FILE) or None
+
+def save_bracket(state):
+    """Зберегти стан сітки"""
+    save_data(BRACKET_FILE, state)
+    # Будь-яка зміна сітки робить закешовану таблицю застарілою
+    _standings_pages.clear()
+
+def format_pairings(state, matches):
+    """Рядки з парами матчів"""
+    entrants = state['entrants']
+
+    def label(team_id):
+        if team_id is None:
+            return "—"
+        team = entrants[team_id]
+        return f"{team['team_name']} [{team['team_tag']}]"
+
+    lines = []
+    for match in matches:
+        if match['b'] is None and match['winner'] is not None:
+            lines.append(f"{match['id']}: {label(match['a'])} — bye")
         else:
-            winner_info += f"\n🆔 ID: {winner_id}"
+            best_of = f" (BO{match['best_of']})" if match['best_of'] > 1 else ""
+            lines.append(f"{match['id']}: {label(match['a'])} vs {label(match['b'])}{best_of}")
+    return lines
+
+async def post_pairings(update, title, lines):
+    """Надіслати пари частинами"""
+    for text in split_message([title, ""] + lines):
+        await update.message.reply_text(text)
+
+async def swiss_round(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Згенерувати наступний раунд швейцарської системи: /swiss_round [random]"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Немає доступу")
+        return
+
+    state = load_bracket()
+    if state is None:
+        registrations = load_data(REGISTRATIONS_FILE)
+        if len(registrations) < 2:
+            await update.message.reply_text("❌ Для сітки потрібно щонайменше 2 команди")
+            return
+        randomize = bool(context.args) and context.args[0] == 'random'
+        state = bracket.new_bracket(bracket.seed_teams(registrations, randomize))
+
+    if state.get('playoff'):
+        await update.message.reply_text("❌ Плей-офф уже розпочато")
+        return
+
+    # Таблицю будуємо до жеребкування, щоб bye нового раунду не врахувався двічі
+    rows = standings.ensure_standings(state)
+    try:
+        matches = bracket.pair_swiss_round(state)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+
+    standings.record_round(rows, matches)
+    save_bracket(state)
+    round_number = len(state['swiss']['rounds'])
+    await post_pairings(update, f"🎯 SWISS - РАУНД {round_number}", format_pairings(state, matches))
 
+async def playoff(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Побудувати плей-офф: /playoff <кількість команд> [bo1|bo3]"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Немає доступу")
+        return
+
+    args = context.args or []
+    best_of = 1 if len(args) > 1 and args[1].lower() == 'bo1' else 3
+    try:
+        size = int(args[0])
+    except (IndexError, ValueError):
+        size = 0
+    if size < 2:
+        await update.message.reply_text("Використання: /playoff <кількість команд, від 2> [bo1|bo3]")
+        return
+
+    state = load_bracket()
+    if state is None:
+        registrations = load_data(REGISTRATIONS_FILE)
+        state = bracket.new_bracket(bracket.seed_teams(registrations))
+
+    if state.get('playoff'):
+        await update.message.reply_text("❌ Плей-офф уже розпочато")
+        return
+
+    swiss_rounds = state['swiss']['rounds']
+    if swiss_rounds and not bracket.round_complete(swiss_rounds[-1]):
+        await update.message.reply_text("❌ Поточний раунд Swiss ще не завершено")
+        return
+
+    # Після Swiss відбираємо найкращих за таблицею, інакше - за посівом
+    qualified = standings.ranking(standings.ensure_standings(state))[:size]
+    try:
+        state['playoff'] = bracket.build_single_elimination(qualified, best_of)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+
+    save_bracket(state)
+    await post_pairings(
+        update,
+        f"🏆 ПЛЕЙ-ОФФ ({len(qualified)} команд, BO{best_of})",
+        format_pairings(state, state['playoff']['rounds'][0])
+    )
+
+async def show_bracket(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показати поточний раунд сітки: /bracket"""
+    state = load_bracket()
+    if state is None:
+        await update.message.reply_text("📋 Сітку ще не сформовано")
+        return
+
+    if state.get('playoff'):
+        rounds = state['playoff']['rounds']
+        current = next((r for r in rounds if not bracket.round_complete(r)), rounds[-1])
+        title = f"🏆 ПЛЕЙ-ОФФ - РАУНД {rounds.index(current) + 1}"
+    elif state['swiss']['rounds']:
+        current = state['swiss']['rounds'][-1]
+        title = f"🎯 SWISS - РАУНД {len(state['swiss']['rounds'])}"
+    else:
+        await update.message.reply_text("📋 Раунди ще не згенеровано")
+        return
+
+    await post_pairings(update, title, format_pairings(state, current))
+
+# ============= РЕЗУЛЬТАТИ ТА ТАБЛИЦЯ =============
+
+def match_captains(state, match):
+    """user_id капітанів обох команд матчу"""
+    entrants = state['entrants']
+    return {entrants[team_id]['user_id'] for team_id in (match['a'], match['b']) if team_id is not None}
+
+def parse_score(text, best_of):
+    """Розібрати рахунок 'x:y'; None, якщо рахунок неможливий для матчу"""
+    found = SCORE_PATTERN.match(text)
+    if not found:
+        return None
+    ours, theirs = int(found.group(1)), int(found.group(2))
+    if ours == theirs:
+        return None
+    if best_of > 1 and max(ours, theirs) != best_of // 2 + 1:
+        return None
+    return ours, theirs
+
+def apply_match_result(state, match, score_a, score_b):
+    """Записати результат і оновити лише зачеплені частини таблиці та дерева"""
+    # Таблицю старого файлу будуємо до запису результату, інакше він врахується двічі
+    rows = standings.ensure_standings(state)
+    winner = match['a'] if score_a > score_b else match['b']
+    match['winner'] = winner
+    match['score'] = [score_a, score_b]
+
+    if match['id'].startswith('S'):
+        standings.apply_result(rows, match['a'], match['b'], winner, score_a, score_b)
+    else:
+        bracket.advance_winner(state['playoff'], match['id'])
+
+async def report(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Повідомити результат матчу: /report <матч> <наш рахунок:їхній>"""
+    user_id = update.effective_user.id
+
+    if len(context.args or []) != 2:
+        await update.message.reply_text("Використання: /report <матч> <рахунок>\nНаприклад: /report S1-4 13:9")
+        return
+
+    match_id, score_text = context.args
+    state = load_bracket()
+    match = bracket.find_match(state, match_id) if state else None
+
+    if match is None or match['a'] is None or match['b'] is None:
+        await update.message.reply_text("❌ Матч не знайдено")
+        return
+    if match['winner'] is not None:
+        await update.message.reply_text("❌ Результат цього матчу вже записано")
+        return
+
+    if match_id in state.get('reports', {}):
+        await update.message.reply_text("⏳ Результат цього матчу вже очікує на підтвердження")
+        return
+
+    # Капітан вводить рахунок зі свого боку, адміністратор - як a:b
+    entrants = state['entrants']
+    if user_id == entrants[match['b']]['user_id']:
+        reporter_is_a = False
+    elif user_id == entrants[match['a']]['user_id'] or is_admin(user_id):
+        reporter_is_a = True
+    else:
+        await update.message.reply_text("❌ Результат може повідомити лише капітан команди цього матчу")
+        return
+
+    score = parse_score(score_text, match['best_of'])
+    if score is None:
         await update.message.reply_text(
-            f"🎁 Переможець розіграшу:\n\n"
-            f"{winner_info}"
+            f"❌ Невірний рахунок для BO{match['best_of']}. Формат: 13:9 або 2:1"
         )
+        return
+
+    # Зберігаємо як a:b; nonce прив'язує кнопки адмінів саме до цього запиту
+    score_a, score_b = score if reporter_is_a else (score[1], score[0])
+    nonce = secrets.token_hex(4)
+    state.setdefault('reports', {})[match_id] = {
+        'score': [score_a, score_b],
+        'reporter': user_id,
+        'nonce': nonce,
+        'timestamp': datetime.now().isoformat(),
+    }
+    save_bracket(state)
+
+    text = (
+        f"📝 РЕЗУЛЬТАТ НА ПІДТВЕРДЖЕННЯ\n\n"
+        f"{format_pairings(state, [match])[0]}\n"
+        f"Рахунок: {score_a}:{score_b}\n"
+        f"Повідомив: {user_id}"
+    )
+    keyboard = InlineKeyboardMarkup([[
+        InlineKeyboardButton("✅ Підтвердити", callback_data=f'report_ok_{match_id}_{nonce}'),
+        InlineKeyboardButton("❌ Відхилити", callback_data=f'report_no_{match_id}_{nonce}'),
+    ]])
+    for admin_id in ADMIN_IDS:
+        try:
+            await context.bot.send_message(chat_id=admin_id, text=text, reply_markup=keyboard)
+        except TelegramError as e:
+            logger.warning("Не вдалося надіслати результат адміну %s: %s", admin_id, e)
+
+    await update.message.reply_text("✅ Результат надіслано на підтвердження адміністраторам")
+
+async def review_report(query, context, match_id, nonce, approved):
+    """Підтвердження або відхилення результату адміністратором"""
+    state = load_bracket()
+    reports = (state or {}).get('reports', {})
+    # Кнопки іншого (вже обробленого) запиту на цей матч не спрацьовують
+    pending = reports.pop(match_id) if reports.get(match_id, {}).get('nonce') == (nonce or None) else None
+    match = bracket.find_match(state, match_id) if pending else None
+
+    if match is None or match['winner'] is not None:
+        await query.message.edit_text("❌ Запит уже оброблено або матч не знайдено")
+        return
+
+    if approved:
+        apply_match_result(state, match, *pending['score'])
+    save_bracket(state)
+
+    status = "✅ Результат підтверджено" if approved else "❌ Результат відхилено"
+    await query.message.edit_text(
+        f"{status}\n\n{format_pairings(state, [match])[0]}\n"
+        f"Рахунок: {pending['score'][0]}:{pending['score'][1]}"
+    )
+
+    for user_id in match_captains(state, match):
+        try:
+            await context.bot.send_message(chat_id=user_id, text=f"{status}: матч {match_id}")
+        except TelegramError:
+            pass
+
+async def show_standings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Турнірна таблиця: /standings"""
+    if not _standings_pages:
+        state = load_bracket()
+        if state is None or not state['swiss']['rounds']:
+            await update.message.reply_text("📋 Таблиця з'явиться після першого раунду")
+            return
+        _standings_pages.extend(split_message(["📊 ТУРНІРНА ТАБЛИЦЯ", ""] + standings.render(state)))
+
+    for page in _standings_pages:
+        await update.message.reply_text(page)
+
+# ============= ІМПОРТ КОМАНД =============
+
+IMPORT_BATCH_SIZE = 1000  # команд між записами файлу
+IMPORT_REPORT_LINES = 30  # помилок у текстовій відповіді
+
+# Поля команди, які мають бути у кожному рядку імпорту
+IMPORT_FIELDS = [field for field in EDIT_FIELDS if field != 'comments']
+STEAM_FIELDS = [field for field in EDIT_FIELDS if field.endswith('_steam')]
+
+IMPORT_ENCODING_ERROR = "некоректне кодування (потрібен UTF-8)"
+
+def _decoded_lines(f, bad_lines):
+    """Рядки бінарного файлу як текст; номери рядків не в UTF-8 додаються до bad_lines"""
+    for line_no, raw in enumerate(f, 1):
+        if line_no == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            bad_lines.add(line_no)
+            yield raw.decode('utf-8', errors='replace')
+
+def iter_import_rows(path):
+    """Потоково читати CSV або JSONL: трійки (номер рядка, dict, помилка).
+
+    Некоректне кодування чи розмітка стають помилкою окремого рядка,
+    а не перериває імпорт посередині файлу.
+    """
+    bad_lines = set()
+    with open(path, 'rb') as f:
+        lines = _decoded_lines(f, bad_lines)
+        if path.lower().endswith('.csv'):
+            reader = csv.reader(lines)
+            header = None
+            last_line = 0
+            while True:
+                try:
+                    values = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as e:
+                    last_line = reader.line_num
+                    yield last_line, None, f"некоректний CSV: {e}"
+                    continue
+
+                # Запис CSV може займати кілька фізичних рядків
+                first_line, last_line = last_line + 1, reader.line_num
+                if header is None:
+                    header = values
+                elif any(line_no in bad_lines for line_no in range(first_line, last_line + 1)):
+                    yield last_line, None, IMPORT_ENCODING_ERROR
+                elif values:
+                    yield last_line, dict(zip(header, values)), None
+        else:
+            for line_no, line in enumerate(lines, 1):
+                if line_no in bad_lines:
+                    yield line_no, None, IMPORT_ENCODING_ERROR
+                    continue
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield line_no, None, "некоректний JSON"
+                    continue
+                yield line_no, row, None
+
+def validate_import_row(row, names, tags, steam_ids):
+    """Перевірити рядок імпорту; повертає (команда, None) або (None, помилка)"""
+    if not isinstance(row, dict):
+        return None, "рядок не є об'єктом JSON"
+
+    team = {}
+    for field in IMPORT_FIELDS:
+        value, error = validate_field(field, str(row.get(field) or ''))
+        if error:
+            return None, f"{field}: {error.lstrip('❌ ')}"
+        team[field] = value
+
+    comments = str(row.get('comments') or '').strip()
+    team['comments'] = comments if comments and comments != '-' else "Без коментарів"
+
+    if team['team_name'].casefold() in names:
+        return None, f"команда {team['team_name']} вже зареєстрована"
+    if team['team_tag'] in tags:
+        return None, f"тег [{team['team_tag']}] вже зайнятий"
+
+    row_steam_ids = [team[field] for field in STEAM_FIELDS]
+    if len(set(row_steam_ids)) != len(row_steam_ids):
+        return None, "однаковий Steam ID у кількох гравців"
+    for steam_id in row_steam_ids:
+        if steam_id in steam_ids:
+            return None, f"Steam ID {steam_id} вже зареєстрований"
+
+    user_id = str(row.get('user_id') or '').strip()
+    if user_id.isdigit():
+        team['user_id'] = int(user_id)
+    team['timestamp'] = datetime.now().isoformat()
+    return team, None
+
+def import_registrations(path, batch_size=IMPORT_BATCH_SIZE):
+    """Імпортувати команди з файлу; повертає (кількість доданих, помилки)"""
+    registrations = load_data(REGISTRATIONS_FILE)
+    names = {team['team_name'].casefold() for team in registrations}
+    tags = {team['team_tag'].upper() for team in registrations}
+    steam_ids = {team[field] for team in registrations for field in STEAM_FIELDS if field in team}
+
+    imported = 0
+    pending = 0
+    errors = []
+
+    for line_no, row, error in iter_import_rows(path):
+        if error is None:
+            team, error = validate_import_row(row, names, tags, steam_ids)
+        if error:
+            errors.append((line_no, error))
+            continue
+
+        registrations.append(team)
+        names.add(team['team_name'].casefold())
+        tags.add(team['team_tag'])
+        steam_ids.update(team[field] for field in STEAM_FIELDS)
+        imported += 1
+        pending += 1
+
+        if pending >= batch_size:
+            save_data(REGISTRATIONS_FILE, registrations)
+            pending = 0
+
+    if pending:
+        save_data(REGISTRATIONS_FILE, registrations)
+
+    logger.info("Імпорт %s: додано %s, помилок %s", path, imported, len(errors))
+    return imported, errors
 
-        await context.bot.send_message(
-            chat_id=winner_id,
-            text="🎉 Вітаємо! Ви виграли розіграш! Організатори зв'яжуться з вами."
+def format_import_errors(errors):
+    """Рядки звіту про помилки імпорту"""
+    return [f"Рядок {line_no}: {error}" for line_no, error in errors]
+
+async def import_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Імпорт команд з надісланого адміном CSV/JSONL файлу"""
+    document = update.message.document
+    suffix = os.path.splitext(document.file_name or '')[1].lower()
+
+    await update.message.reply_text(f"📥 Імпортую {document.file_name}...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"import{suffix}")
+        telegram_file = await document.get_file()
+        await telegram_file.download_to_drive(path)
+        imported, errors = import_registrations(path)
+
+    report_lines = format_import_errors(errors)
+    text = (
+        f"✅ Імпорт завершено\n\n"
+        f"Додано команд: {imported}\n"
+        f"Помилок: {len(errors)}"
+    )
+    if report_lines:
+        text += "\n\n" + "\n".join(report_lines[:IMPORT_REPORT_LINES])
+    await update.message.reply_text(text[:MESSAGE_LIMIT])
+
+    if len(report_lines) > IMPORT_REPORT_LINES:
+        report = io.BytesIO("\n".join(report_lines).encode('utf-8'))
+        await update.message.reply_document(InputFile(report, filename='import_errors.txt'))
+
+# ============= ЗАПЛАНОВАНІ ОГОЛОШЕННЯ =============
+
+SCHEDULE_MISSED_GRACE = 3600  # пропущені більш ніж на годину не надсилаються
+INTERVAL_PATTERN = re.compile(r'^(\d+)([mhd])$')
+INTERVAL_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+def parse_interval(text):
+    """'30m', '2h', '1d' -> секунди (None, якщо формат невірний)"""
+    found = INTERVAL_PATTERN.match(text)
+    if not found or not int(found.group(1)):
+        return None
+    return int(found.group(1)) * INTERVAL_UNITS[found.group(2)]
+
+def format_interval(seconds):
+    """Інтервал у секундах -> '30m' / '2h' / '1d'"""
+    for unit, size in sorted(INTERVAL_UNITS.items(), key=lambda pair: -pair[1]):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+def parse_when(text, now=None):
+    """Час події: '+30m', '18:30' (сьогодні або завтра) чи ISO '2025-11-20T18:30'"""
+    now = now or datetime.now()
+    if text.startswith('+'):
+        seconds = parse_interval(text[1:])
+        return now + timedelta(seconds=seconds) if seconds else None
+
+    found = re.match(r'^(\d{1,2}):(\d{2})$', text)
+    if found:
+        try:
+            when = now.replace(hour=int(found.group(1)), minute=int(found.group(2)), second=0, microsecond=0)
+        except ValueError:
+            return None
+        return when if when > now else when + timedelta(days=1)
+
+    try:
+        when = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    # Час зі зсувом переводимо в локальний - решта розкладу працює з ним
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return when
+
+class AnnouncementScheduler:
+    """Заплановані та повторювані оголошення.
+
+    Усі очікувані події лежать в одній купі (час, ключ), а в JobQueue завжди
+    стоїть лише одне завдання - на найближчу подію. Подія позначається як
+    надіслана і зберігається до відправки, тож після перезапуску нічого
+    не надсилається двічі. Застарілі записи в купі відкидаються при вийманні.
+    """
+
+    def __init__(self):
+        self.state = None
+        self.sent = set()
+        self.heap = []
+        self.seq = itertools.count()
+        self.job = None
+        self.armed_for = None
+
+    def ensure_loaded(self):
+        if self.state is not None:
+            return
+        self.state = load_data(SCHEDULE_FILE) or {
+            'next_id': 1, 'announcements': [], 'reminders': [], 'sent': [],
+        }
+        self.sent = set(self.state['sent'])
+        self._rebuild()
+
+    def save(self):
+        self.state['sent'] = sorted(self.sent)
+        save_data(SCHEDULE_FILE, self.state)
+
+    def _push(self, due, key):
+        heapq.heappush(self.heap, (due, next(self.seq), key))
+
+    def _rebuild(self):
+        self.heap = []
+        for item in self.state['announcements']:
+            if item['next_due'] is not None:
+                self._push(item['next_due'], ('announcement', item['id']))
+        for rule in self.state['reminders']:
+            self._push_rule(rule)
+
+    def _scheduled_matches(self):
+        state = load_bracket()
+        if not state:
+            return []
+        stages = state['swiss']['rounds'] + (state['playoff']['rounds'] if state.get('playoff') else [])
+        return [match for round_matches in stages for match in round_matches if match.get('start')]
+
+    def _reminder_key(self, rule, match_id, start):
+        return f"r{rule['id']}:{match_id}:{start}"
+
+    def _push_rule(self, rule, matches=None):
+        for match in self._scheduled_matches() if matches is None else matches:
+            if match['winner'] is not None:
+                continue
+            if self._reminder_key(rule, match['id'], match['start']) in self.sent:
+                continue
+            due = datetime.fromisoformat(match['start']).timestamp() - rule['minutes'] * 60
+            self._push(due, ('reminder', rule['id'], match['id'], match['start']))
+
+    def _next_id(self):
+        item_id = self.state['next_id']
+        self.state['next_id'] += 1
+        return item_id
+
+    def add_announcement(self, when, text, segment, every, created_by):
+        self.ensure_loaded()
+        item = {
+            'id': self._next_id(),
+            'next_due': when.timestamp(),
+            'every': every,
+            'segment': segment,
+            'text': text,
+            'created_by': created_by,
+        }
+        self.state['announcements'].append(item)
+        self.save()
+        self._push(item['next_due'], ('announcement', item['id']))
+        return item
+
+    def add_reminder(self, minutes, text, created_by):
+        self.ensure_loaded()
+        rule = {'id': self._next_id(), 'minutes': minutes, 'text': text, 'created_by': created_by}
+        self.state['reminders'].append(rule)
+        self.save()
+        self._push_rule(rule)
+        return rule
+
+    def on_match_time(self, match):
+        """Запланувати нагадування для матчу, якому щойно призначено час"""
+        self.ensure_loaded()
+        for rule in self.state['reminders']:
+            self._push_rule(rule, [match])
+
+    def cancel(self, item_id):
+        self.ensure_loaded()
+        for collection in ('announcements', 'reminders'):
+            items = self.state[collection]
+            for i, item in enumerate(items):
+                if item['id'] == item_id:
+                    items.pop(i)
+                    self.save()
+                    return True
+        return False
+
+    def pending(self):
+        self.ensure_loaded()
+        return (
+            [item for item in self.state['announcements'] if item['next_due'] is not None],
+            self.state['reminders'],
         )
-    except:
-        await update.message.reply_text(f"🎁 Переможець: ID {winner_id}")
+
+    def arm(self, job_queue):
+        """Поставити єдине завдання JobQueue на найближчу подію"""
+        if not self.heap:
+            return
+        due = self.heap[0][0]
+        if self.job is not None and self.armed_for <= due:
+            return
+        if self.job is not None:
+            self.job.schedule_removal()
+        self.armed_for = due
+        self.job = job_queue.run_once(self.fire, when=max(0.0, due - time.time()), name='announcements')
+
+    def _take_due(self, now):
+        """Вийняти з купи всі події, час яких настав (з відкиданням застарілих)"""
+        announcements = {item['id']: item for item in self.state['announcements']}
+        reminders = {rule['id']: rule for rule in self.state['reminders']}
+        ready = []
+
+        while self.heap and self.heap[0][0] <= now:
+            due, _, key = heapq.heappop(self.heap)
+            missed = now - due > SCHEDULE_MISSED_GRACE
+
+            if key[0] == 'announcement':
+                item = announcements.get(key[1])
+                if item is None or item['next_due'] != due:
+                    continue
+                if item['every']:
+                    # Пропущені повтори не надолужуємо - лише наступний
+                    periods = int((now - due) // item['every']) + 1
+                    item['next_due'] = due + periods * item['every']
+                    self._push(item['next_due'], key)
+                else:
+                    item['next_due'] = None
+                if not missed:
+                    ready.append(('announcement', item))
+            else:
+                rule = reminders.get(key[1])
+                sent_key = self._reminder_key(rule, key[2], key[3]) if rule else None
+                if rule is None or sent_key in self.sent:
+                    continue
+                self.sent.add(sent_key)
+                if not missed:
+                    ready.append(('reminder', rule, key[2], key[3]))
+
+            if missed:
+                logger.warning("Пропущено застаріле оголошення %s", key)
+
+        return ready
+
+    async def fire(self, context: ContextTypes.DEFAULT_TYPE):
+        """Надіслати всі оголошення, час яких настав"""
+        self.job = None
+        self.armed_for = None
+        self.ensure_loaded()
+
+        ready = self._take_due(time.time())
+
+        # Позначку «надіслано» зберігаємо до відправки
+        self.state['announcements'] = [
+            item for item in self.state['announcements'] if item['next_due'] is not None
+        ]
+        self.save()
+
+        bracket_state = None
+        for event in ready:
+            if event[0] == 'announcement':
+                item = event[1]
+                recipients = audience_index.segment(item['segment']) or iter(())
+                text = f"📢 {item['text']}"
+            else:
+                rule, match_id, start = event[1:]
+                bracket_state = bracket_state or load_bracket()
+                match = bracket.find_match(bracket_state, match_id) if bracket_state else None
+                # Матч могли перенести або вже зіграти
+                if match is None or match.get('start') != start or match['winner'] is not None:
+                    continue
+                recipients = iter(match_captains(bracket_state, match))
+                text = f"⏰ {format_pairings(bracket_state, [match])[0]}\n\n{rule['text']}"
+
+            success, failed, aborted = await send_broadcast(context.bot, recipients, text)
+            logger.info("Оголошення %s: успішно %s, помилок %s", event[1]['id'], success, failed)
+            if aborted:
+                logger.error("Оголошення %s перервано: API недоступний", event[1]['id'])
+
+        self.arm(context.job_queue)
+
+scheduler = AnnouncementScheduler()
+
+async def scheduler_startup(context: ContextTypes.DEFAULT_TYPE):
+    """Відкладене завантаження розкладу після запуску бота"""
+    scheduler.ensure_loaded()
+    scheduler.arm(context.job_queue)
+
+async def schedule_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Запланувати оголошення: /schedule <коли> [--every <інтервал>] [--segment <сегмент>] текст"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Немає доступу")
+        return
+
+    args = list(context.args or [])
+    usage = (
+        "Використання: /schedule <коли> [--every <інтервал>] [--segment <сегмент>] текст\n\n"
+        "Коли: +30m, 18:30 або 2025-11-20T18:30\n"
+        "Інтервал: 30m, 2h, 1d\n"
+        f"Сегменти: {SEGMENTS_HELP}"
+    )
+
+    when = parse_when(args.pop(0)) if args else None
+    every = None
+    segment = 'all'
+    while len(args) > 1 and args[0] in ('--every', '--segment'):
+        option, value = args.pop(0), args.pop(0)
+        if option == '--every':
+            every = parse_interval(value)
+            if every is None:
+                when = None
+        else:
+            segment = value
+
+    if when is None or not args:
+        await update.message.reply_text(usage)
+        return
+    if when <= datetime.now():
+        await update.message.reply_text(f"❌ Час {when.strftime('%Y-%m-%d %H:%M')} уже минув")
+        return
+    if audience_index.segment(segment) is None:
+        await update.message.reply_text(f"❌ Невідомий сегмент: {segment}")
+        return
+
+    item = scheduler.add_announcement(when, ' '.join(args), segment, every, update.effective_user.id)
+    scheduler.arm(context.job_queue)
+
+    repeat = f"\n🔁 Кожні {format_interval(every)}" if every else ""
+    await update.message.reply_text(
+        f"✅ Оголошення #{item['id']} заплановано на {when.strftime('%Y-%m-%d %H:%M')}{repeat}\n"
+        f"Сегмент: {segment}"
+    )
+
+async def remind_before(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Нагадування капітанам перед кожним матчем: /remind_before <хвилин> текст"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Немає доступу")
+        return
+
+    args = context.args or []
+    if len(args) < 2 or not args[0].isdigit() or not int(args[0]):
+        await update.message.reply_text("Використання: /remind_before <хвилин> текст")
+        return
+
+    rule = scheduler.add_reminder(int(args[0]), ' '.join(args[1:]), update.effective_user.id)
+    scheduler.arm(context.job_queue)
+    await update.message.reply_text(
+        f"✅ Нагадування #{rule['id']}: за {rule['minutes']} хв до кожного матчу.\n"
+        f"Час матчу задається командою /match_time <матч> <коли>"
+    )
+
+async def match_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Призначити час матчу: /match_time <матч> <коли>"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Немає доступу")
+        return
+
+    args = context.args or []
+    when = parse_when(args[1]) if len(args) == 2 else None
+    if when is None:
+        await update.message.reply_text("Використання: /match_time <матч> <коли>\nНаприклад: /match_time S2-5 19:00")
+        return
+
+    state = load_bracket()
+    match = bracket.find_match(state, args[0]) if state else None
+    if match is None or match['winner'] is not None:
+        await update.message.reply_text("❌ Матч не знайдено або вже зіграно")
+        return
+
+    match['start'] = when.isoformat(timespec='minutes')
+    save_bracket(state)
+    scheduler.on_match_time(match)
+    scheduler.arm(context.job_queue)
+
+    await update.message.reply_text(
+        f"✅ {format_pairings(state, [match])[0]}\n🕒 {when.strftime('%Y-%m-%d %H:%M')}"
+    )
+
+async def schedule_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Список запланованих оголошень і нагадувань: /schedule_list"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Немає доступу")
+        return
+
+    announcements, reminders = scheduler.pending()
+    if not announcements and not reminders:
+        await update.message.reply_text("📋 Запланованих оголошень немає")
+        return
+
+    lines = ["🗓 ЗАПЛАНОВАНІ ОГОЛОШЕННЯ", ""]
+    for item in sorted(announcements, key=lambda item: item['next_due']):
+        due = datetime.fromtimestamp(item['next_due']).strftime('%Y-%m-%d %H:%M')
+        repeat = f" 🔁 {format_interval(item['every'])}" if item['every'] else ""
+        lines.append(f"#{item['id']} {due}{repeat} [{item['segment']}]: {item['text']}")
+    for rule in reminders:
+        lines.append(f"#{rule['id']} ⏰ за {rule['minutes']} хв до матчу: {rule['text']}")
+    lines.append("")
+    lines.append("Скасувати: /schedule_cancel <id>")
+
+    for text in split_message(lines):
+        await update.message.reply_text(text)
+
+async def schedule_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Скасувати оголошення або нагадування: /schedule_cancel <id>"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Немає доступу")
+        return
+
+    args = context.args or []
+    if len(args) != 1 or not args[0].lstrip('#').isdigit():
+        await update.message.reply_text("Використання: /schedule_cancel <id>")
+        return
+
+    if scheduler.cancel(int(args[0].lstrip('#'))):
+        await update.message.reply_text("✅ Скасовано")
+    else:
+        await update.message.reply_text("❌ Не знайдено")
+
+# ============= РЕЗЕРВНЕ КОПІЮВАННЯ =============
+
+def backup_paths():
+    """Файли даних, що потрапляють у резервну копію"""
+    paths = [REGISTRATIONS_FILE, SUBSCRIBERS_FILE, BRACKET_FILE, GIVEAWAYS_FILE, SCHEDULE_FILE]
+    paths += [snapshot_path(filename) for filename in SNAPSHOT_FILES]
+    return paths
+
+async def backup_job(context: ContextTypes.DEFAULT_TYPE):
+    """Періодична інкрементальна копія (у окремому потоці, щоб не блокувати бота)"""
+    try:
+        name, written = await asyncio.to_thread(
+            backup.create_backup, backup_paths(), BACKUP_DIR, BACKUP_KEEP
+        )
+    except (OSError, backup.BackupError) as e:
+        logger.error("Помилка резервного копіювання: %s", e)
+        return
+
+    if name:
+        logger.info("Резервна копія %s: нових шматків %s", name, written)
 
 # ============= ЗАПУСК БОТА =============
 
+def run_cli(argv):
+    """Службові команди: python main.py import|convert|backup|restore ..."""
+    parser = argparse.ArgumentParser(prog='main.py', description="Службові команди бота")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="Імпорт команд з CSV/JSONL")
+    import_parser.add_argument('path', help="Файл .csv або .jsonl")
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    convert_parser = commands.add_parser('convert', help="Конвертація файлів даних між JSON і знімками")
+    convert_parser.add_argument('direction', choices=['to-snapshot', 'to-json'])
+
+    commands.add_parser('backup', help="Створити резервну копію зараз")
+
+    restore_parser = commands.add_parser('restore', help="Відновити дані з резервної копії")
+    restore_parser.add_argument('--at', type=datetime.fromisoformat,
+                                help="Момент часу, напр. 2025-11-20T18:30 (за замовчуванням - остання копія)")
+    restore_parser.add_argument('--target', default='.', help="Каталог для відновлених файлів")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        imported, errors = import_registrations(args.path, args.batch_size)
+        for line in format_import_errors(errors):
+            print(line)
+        print(f"Додано команд: {imported}, помилок: {len(errors)}")
+
+    elif args.command == 'convert':
+        for filename in SNAPSHOT_FILES:
+            if args.direction == 'to-snapshot':
+                if not os.path.exists(filename):
+                    continue
+                count = snapshot.json_to_snapshot(filename, snapshot_path(filename))
+                print(f"{filename} → {snapshot_path(filename)}: {count} записів")
+            else:
+                if not os.path.exists(snapshot_path(filename)):
+                    continue
+                try:
+                    count = snapshot.snapshot_to_json(snapshot_path(filename), filename)
+                except snapshot.SnapshotError as e:
+                    sys.exit(f"❌ {e}")
+                print(f"{snapshot_path(filename)} → {filename}: {count} записів")
+
+    elif args.command == 'backup':
+        name, written = backup.create_backup(backup_paths(), BACKUP_DIR, BACKUP_KEEP)
+        print(f"Копія {name}: нових шматків {written}" if name else "Змін з останньої копії немає")
+
+    elif args.command == 'restore':
+        try:
+            manifest, restored, removed = backup.restore(BACKUP_DIR, args.at, args.target, backup_paths())
+        except backup.BackupError as e:
+            sys.exit(f"❌ {e}")
+        print(f"Відновлено стан на {manifest['timestamp']}:")
+        for path in restored:
+            print(f"  {path}")
+        for path in removed:
+            print(f"  {path} (видалено - на той момент файлу не було)")
+
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """Журнал помилок обробників; при пошкоджених даних - зрозуміла відповідь"""
+    logger.error("Помилка обробки оновлення", exc_info=context.error)
+    if not isinstance(context.error, snapshot.SnapshotError):
+        return
+    if isinstance(update, Update) and update.effective_message:
+        try:
+            await update.effective_message.reply_text(
+                "⚠️ Дані бота тимчасово недоступні. Спробуйте пізніше."
+            )
+        except TelegramError:
+            pass
+
 def main():
     """Головна функція"""
+    if len(sys.argv) > 1:
+        run_cli(sys.argv[1:])
+        return
 
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(update_processor)
+        .request(api_request)
+        .build()
+    )
 
     # Обробник реєстрації
     conv_handler = ConversationHandler(
@@ -938,8 +2645,31 @@ def main():
             P5_STEAM: [MessageHandler(filters.TEXT & ~filters.COMMAND, player5_steam)],
             COMMENTS: [MessageHandler(filters.TEXT & ~filters.COMMAND, comments)],
             CONFIRM: [MessageHandler(filters.TEXT & ~filters.COMMAND, confirm)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, registration_timeout)],
         },
         fallbacks=[CommandHandler('cancel', cancel)],
+        conversation_timeout=REGISTRATION_TIMEOUT,
+    )
+
+    # Сесія редагування команди (зміни накопичуються і записуються разом)
+    edit_handler = ConversationHandler(
+        entry_points=[CallbackQueryHandler(edit_start, pattern='^admin_edit$')],
+        states={
+            EDIT_SELECT_TEAM: [CallbackQueryHandler(edit_select_team, pattern=r'^edit_team_\d+$')],
+            EDIT_SELECT_FIELD: [
+                CallbackQueryHandler(edit_select_field, pattern='^edit_field_'),
+                CallbackQueryHandler(edit_commit, pattern='^edit_commit$'),
+            ],
+            EDIT_INPUT_VALUE: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_input_value)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, edit_timeout)],
+        },
+        fallbacks=[
+            CallbackQueryHandler(edit_discard, pattern='^(edit_discard|back_to_admin)$'),
+            CommandHandler('cancel', edit_cancel),
+        ],
+        # Повторне натискання "Редагувати команду" починає нову сесію
+        allow_reentry=True,
+        conversation_timeout=EDIT_TIMEOUT,
     )
 
     # Додаємо обробники
@@ -947,14 +2677,32 @@ def main():
     application.add_handler(CommandHandler("admin", admin_panel))
     application.add_handler(CommandHandler("broadcast", broadcast))
     application.add_handler(CommandHandler("giveaway", giveaway))
+    application.add_handler(CommandHandler("swiss_round", swiss_round))
+    application.add_handler(CommandHandler("playoff", playoff))
+    application.add_handler(CommandHandler("bracket", show_bracket))
+    application.add_handler(CommandHandler("report", report))
+    application.add_handler(CommandHandler("standings", show_standings))
+    application.add_handler(CommandHandler("schedule", schedule_command))
+    application.add_handler(CommandHandler("remind_before", remind_before))
+    application.add_handler(CommandHandler("match_time", match_time))
+    application.add_handler(CommandHandler("schedule_list", schedule_list))
+    application.add_handler(CommandHandler("schedule_cancel", schedule_cancel))
     application.add_handler(conv_handler)
+    application.add_handler(edit_handler)
     application.add_handler(CallbackQueryHandler(button_callback))
-
-    # Обробник для редагування (працює поза ConversationHandler)
     application.add_handler(MessageHandler(
-        filters.TEXT & ~filters.COMMAND,
-        handle_edit_input
+        filters.User(user_id=ADMIN_IDS)
+        & (filters.Document.FileExtension('csv') | filters.Document.FileExtension('jsonl')),
+        import_document
     ))
+    application.add_error_handler(error_handler)
+
+    # Інкрементальні резервні копії та розклад оголошень (завантажується після старту)
+    if application.job_queue:
+        application.job_queue.run_repeating(backup_job, interval=BACKUP_INTERVAL, first=60)
+        application.job_queue.run_once(scheduler_startup, when=1)
+    else:
+        logger.warning("JobQueue недоступна - встановіть python-telegram-bot[job-queue]")
 
     # Запускаємо бота
     logger.info("🤖 Бот запущено!")
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Компактний бінарний формат знімків для списків записів (команди, підписники)
+
+Структура файлу:
+    заголовок  - magic, версія, кількість записів, зсув індексу, CRC32
+    записи     - u32 довжина, u16 + назва, u16 + тег, компактний JSON запису
+    індекс     - u64 зсув кожного запису
+
+Читання через mmap: запис декодується лише при зверненні до нього,
+а назву й тег команди можна отримати без розбору JSON.
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b'CS2S'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sHHIQI')  # magic, версія, резерв, кількість, зсув індексу, crc32
+RECORD_LENGTH = struct.Struct('<I')
+LABEL_LENGTH = struct.Struct('<H')
+OFFSET = struct.Struct('<Q')
+
+
+class SnapshotError(Exception):
+    """Пошкоджений або несумісний файл знімка"""
+
+
+def _encode_label(record, key):
+    if isinstance(record, dict):
+        return str(record.get(key, '')).encode('utf-8')
+    return b''
+
+
+def write_snapshot(path, records):
+    """Записати список записів у знімок (атомарно)"""
+    body = bytearray()
+    offsets = []
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    for record in records:
+        name = _encode_label(record, 'team_name')
+        tag = _encode_label(record, 'team_tag')
+        payload = dumps(record).encode('utf-8')
+        offsets.append(HEADER.size + len(body))
+        body += RECORD_LENGTH.pack(LABEL_LENGTH.size * 2 + len(name) + len(tag) + len(payload))
+        body += LABEL_LENGTH.pack(len(name)) + name
+        body += LABEL_LENGTH.pack(len(tag)) + tag
+        body += payload
+
+    index_offset = HEADER.size + len(body)
+    body += struct.pack(f'<{len(offsets)}Q', *offsets)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(offsets), index_offset, zlib.crc32(body))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Знімок, відображений у пам'ять; записи декодуються ліниво"""
+
+    def __init__(self, path, verify=True):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError(f"{path}: порожній файл")
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise SnapshotError(f"{path}: неповний заголовок")
+
+        magic, version, _, self.count, self._index_offset, checksum = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise SnapshotError(f"{path}: невідомий формат")
+        if self._index_offset + self.count * OFFSET.size != len(self._map):
+            self.close()
+            raise SnapshotError(f"{path}: невірний розмір файлу")
+        if verify and zlib.crc32(memoryview(self._map)[HEADER.size:]) != checksum:
+            self.close()
+            raise SnapshotError(f"{path}: контрольна сума не збігається")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def _offset(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return OFFSET.unpack_from(self._map, self._index_offset + index * OFFSET.size)[0]
+
+    def _offsets(self):
+        return struct.unpack_from(f'<{self.count}Q', self._map, self._index_offset)
+
+    def _labels(self, position):
+        """(назва, тег, зсув JSON) для запису, що починається з position"""
+        position += RECORD_LENGTH.size
+        (name_length,) = LABEL_LENGTH.unpack_from(self._map, position)
+        position += LABEL_LENGTH.size
+        name = self._map[position:position + name_length]
+        position += name_length
+        (tag_length,) = LABEL_LENGTH.unpack_from(self._map, position)
+        position += LABEL_LENGTH.size
+        tag = self._map[position:position + tag_length]
+        return name, tag, position + tag_length
+
+    def __getitem__(self, index):
+        position = self._offset(index)
+        (length,) = RECORD_LENGTH.unpack_from(self._map, position)
+        _, _, start = self._labels(position)
+        end = position + RECORD_LENGTH.size + length
+        return json.loads(self._map[start:end])
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def label(self, index):
+        """Назва і тег команди без декодування всього запису"""
+        try:
+            name, tag, _ = self._labels(self._offset(index))
+            return name.decode('utf-8'), tag.decode('utf-8')
+        except (struct.error, UnicodeDecodeError) as e:
+            raise SnapshotError(f"пошкоджений запис {index}: {e}")
+
+    def labels(self):
+        """Назви й теги всіх команд"""
+        result = []
+        try:
+            for position in self._offsets():
+                name, tag, _ = self._labels(position)
+                result.append((name.decode('utf-8'), tag.decode('utf-8')))
+        except (struct.error, UnicodeDecodeError) as e:
+            raise SnapshotError(f"пошкоджений запис {len(result)}: {e}")
+        return result
+
+    def read_all(self):
+        """Усі записи одним розбором JSON (швидше за декодування по одному)"""
+        payloads = []
+        for position in self._offsets():
+            (length,) = RECORD_LENGTH.unpack_from(self._map, position)
+            _, _, start = self._labels(position)
+            payloads.append(self._map[start:position + RECORD_LENGTH.size + length])
+        return json.loads(b'[' + b','.join(payloads) + b']')
+
+
+def read_snapshot(path, verify=True):
+    """Прочитати всі записи знімка у список"""
+    with Snapshot(path, verify) as snap:
+        return snap.read_all()
+
+
+def json_to_snapshot(json_path, snapshot_path):
+    """Конвертувати JSON-файл даних у знімок; повертає кількість записів"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    write_snapshot(snapshot_path, records)
+    return len(records)
+
+
+def snapshot_to_json(snapshot_path, json_path):
+    """Конвертувати знімок назад у JSON у форматі save_data"""
+    records = read_snapshot(snapshot_path)
+    tmp_path = f"{json_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, json_path)
+    return len(records)
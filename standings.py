@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Турнірна таблиця швейцарської системи з інкрементальним оновленням
+Рядки таблиці зберігаються у стані сітки (state['standings']), індекс = id учасника
+Кожен результат оновлює лише двох учасників та їхніх суперників (Buchholz)
+"""
+
+
+def new_row():
+    """Порожній рядок таблиці"""
+    return {
+        'wins': 0,
+        'losses': 0,
+        'rounds_for': 0,
+        'rounds_against': 0,
+        'buchholz': 0,
+        'opponents': [],
+    }
+
+
+def _add_win(rows, team_id):
+    row = rows[team_id]
+    row['wins'] += 1
+    # Buchholz = сума перемог суперників, тож оновлюємо лише їх
+    for opponent in row['opponents']:
+        rows[opponent]['buchholz'] += 1
+
+
+def apply_bye(rows, team_id):
+    """Технічна перемога без суперника"""
+    _add_win(rows, team_id)
+
+
+def apply_result(rows, a, b, winner, score_a, score_b):
+    """Врахувати результат матчу a проти b"""
+    row_a, row_b = rows[a], rows[b]
+
+    row_a['opponents'].append(b)
+    row_b['opponents'].append(a)
+    row_a['buchholz'] += row_b['wins']
+    row_b['buchholz'] += row_a['wins']
+
+    row_a['rounds_for'] += score_a
+    row_a['rounds_against'] += score_b
+    row_b['rounds_for'] += score_b
+    row_b['rounds_against'] += score_a
+
+    loser = b if winner == a else a
+    rows[loser]['losses'] += 1
+    _add_win(rows, winner)
+
+
+def record_round(rows, matches):
+    """Врахувати технічні перемоги щойно згенерованого раунду"""
+    for match in matches:
+        if match['b'] is None and match['winner'] is not None:
+            apply_bye(rows, match['winner'])
+
+
+def ensure_standings(state):
+    """Таблиця зі стану; для старих файлів сітки будується один раз з матчів"""
+    rows = state.get('standings')
+    if rows is not None:
+        return rows
+
+    rows = [new_row() for _ in state['entrants']]
+    for round_matches in state['swiss']['rounds']:
+        for match in round_matches:
+            if match['winner'] is None:
+                continue
+            if match['b'] is None:
+                apply_bye(rows, match['winner'])
+            else:
+                score_a, score_b = match['score'] or (0, 0)
+                apply_result(rows, match['a'], match['b'], match['winner'], score_a, score_b)
+    state['standings'] = rows
+    return rows
+
+
+def ranking(rows):
+    """Порядок учасників: перемоги, Buchholz, різниця раундів, посів"""
+    return sorted(
+        range(len(rows)),
+        key=lambda team_id: (
+            -rows[team_id]['wins'],
+            -rows[team_id]['buchholz'],
+            rows[team_id]['rounds_against'] - rows[team_id]['rounds_for'],
+            team_id,
+        )
+    )
+
+
+def render(state):
+    """Рядки турнірної таблиці"""
+    rows = ensure_standings(state)
+    entrants = state['entrants']
+    lines = []
+    for place, team_id in enumerate(ranking(rows), 1):
+        row = rows[team_id]
+        team = entrants[team_id]
+        diff = row['rounds_for'] - row['rounds_against']
+        lines.append(
+            f"{place}. {team['team_name']} [{team['team_tag']}] — "
+            f"{row['wins']}-{row['losses']}, Бх {row['buchholz']}, {diff:+d}"
+        )
+    return lines
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Тести інкрементальних резервних копій"""
+
+import json
+import os
+import random
+import zlib
+from datetime import datetime
+
+import pytest
+
+import backup
+import snapshot
+
+
+def make_data(count, seed=0):
+    rng = random.Random(seed)
+    teams = [
+        {'team_name': f"Team {i}", 'team_tag': f"T{i}", 'cap_steam': str(rng.getrandbits(60))}
+        for i in range(count)
+    ]
+    return json.dumps(teams, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_chunks_join_back_and_respect_limits():
+    data = make_data(5000)
+    chunks = backup.split_chunks(data)
+    assert b''.join(chunks) == data
+    assert len(chunks) > 1
+    assert all(len(chunk) <= backup.CHUNK_MAX for chunk in chunks)
+    assert all(len(chunk) >= backup.CHUNK_MIN for chunk in chunks[:-1])
+
+
+def test_long_lines_are_cut_at_chunk_max():
+    data = b'x' * (backup.CHUNK_MAX * 2 + 10)
+    chunks = backup.split_chunks(data)
+    assert b''.join(chunks) == data
+    assert [len(chunk) for chunk in chunks] == [backup.CHUNK_MAX, backup.CHUNK_MAX, 10]
+
+
+def test_insert_changes_only_nearby_chunks():
+    data = make_data(5000)
+    position = data.index(b'"Team 2500"')
+    changed = data[:position] + b'"Inserted", "x": 1, ' + data[position:]
+
+    before = set(backup.split_chunks(data))
+    after = backup.split_chunks(changed)
+    new = [chunk for chunk in after if chunk not in before]
+    assert len(new) <= 2
+
+
+def make_snapshot(tmp_path, teams):
+    path = str(tmp_path / 'registrations.snap')
+    snapshot.write_snapshot(path, teams)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_binary_chunks_join_back_and_respect_limits():
+    data = b'\0' + random.Random(3).randbytes(600 * 1024)
+    chunks = backup.split_chunks(data)
+    assert b''.join(chunks) == data
+    assert len(chunks) > 1
+    assert all(len(chunk) <= backup.CHUNK_MAX for chunk in chunks)
+    assert all(len(chunk) >= backup.CHUNK_MIN for chunk in chunks[:-1])
+
+
+def test_snapshot_change_rewrites_few_chunks(tmp_path):
+    teams = json.loads(make_data(3000))
+    before = backup.split_chunks(make_snapshot(tmp_path, teams))
+    # Знімок містить нульові байти - ріжеться gear-хешем, а не по рядках
+    assert len(before) > 10
+
+    teams[1500]['team_name'] = "Renamed"
+    teams.insert(700, {'team_name': "New", 'team_tag': "NEW"})
+    after = backup.split_chunks(make_snapshot(tmp_path, teams))
+    known = set(before)
+    assert sum(chunk not in known for chunk in after) <= 8
+
+
+def test_unchanged_files_do_not_create_backup(workdir):
+    write('registrations.json', make_data(100))
+    name, written = backup.create_backup(['registrations.json'], 'backups', keep=5)
+    assert name and written >= 1
+    assert backup.create_backup(['registrations.json'], 'backups', keep=5) == (None, 0)
+
+
+def test_small_change_writes_few_chunks(workdir):
+    data = make_data(5000)
+    write('registrations.json', data)
+    backup.create_backup(['registrations.json'], 'backups', keep=5)
+
+    write('registrations.json', data.replace(b'"Team 4000"', b'"Renamed"'))
+    name, written = backup.create_backup(['registrations.json'], 'backups', keep=5)
+    assert name is not None
+    assert 1 <= written <= 2
+
+
+def test_restore_at_time_and_remove_files_that_did_not_exist(workdir):
+    write('registrations.json', b'[1]\n')
+    first, _ = backup.create_backup(['registrations.json', 'bracket.json'], 'backups', keep=5)
+
+    write('registrations.json', b'[1, 2]\n')
+    write('bracket.json', b'{}\n')
+    backup.create_backup(['registrations.json', 'bracket.json'], 'backups', keep=5)
+
+    at = datetime.strptime(first[:-len('.json')], backup.TIMESTAMP_FORMAT)
+    manifest, restored, removed = backup.restore(
+        'backups', at, '.', managed=['registrations.json', 'bracket.json']
+    )
+    assert restored == [os.path.join('.', 'registrations.json')]
+    assert removed == [os.path.join('.', 'bracket.json')]
+    with open('registrations.json', 'rb') as f:
+        assert f.read() == b'[1]\n'
+    assert not os.path.exists('bracket.json')
+
+
+def test_restore_latest_into_other_directory(workdir):
+    write('registrations.json', make_data(50))
+    backup.create_backup(['registrations.json'], 'backups', keep=5)
+
+    _, restored, removed = backup.restore('backups', target_dir='restored')
+    assert removed == []
+    with open(restored[0], 'rb') as f:
+        assert f.read() == make_data(50)
+
+
+def test_restore_before_first_backup_fails(workdir):
+    write('registrations.json', b'[]')
+    backup.create_backup(['registrations.json'], 'backups', keep=5)
+    with pytest.raises(backup.BackupError):
+        backup.restore('backups', datetime(2000, 1, 1))
+
+
+def test_corrupt_chunk_is_detected(workdir):
+    write('registrations.json', make_data(10))
+    name, _ = backup.create_backup(['registrations.json'], 'backups', keep=5)
+    digest = backup.load_manifest('backups', name)['files']['registrations.json']['chunks'][0]
+    write(backup._chunk_path('backups', digest), zlib.compress(b'other'))
+
+    with pytest.raises(backup.BackupError):
+        backup.restore('backups', target_dir='restored')
+
+
+def test_corrupt_manifest_is_detected(workdir):
+    write('registrations.json', make_data(10))
+    name, _ = backup.create_backup(['registrations.json'], 'backups', keep=5)
+    path = os.path.join('backups', 'manifests', name)
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['files']['registrations.json']['size'] += 1
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(backup.BackupError):
+        backup.load_manifest('backups', name)
+
+
+def test_prune_keeps_latest_and_removes_unreferenced_chunks(workdir):
+    for i in range(4):
+        write('registrations.json', make_data(20, seed=i))
+        backup.create_backup(['registrations.json'], 'backups', keep=2)
+
+    manifests = backup.list_manifests('backups')
+    assert len(manifests) == 2
+
+    referenced = set()
+    for name in manifests:
+        for entry in backup.load_manifest('backups', name)['files'].values():
+            referenced.update(entry['chunks'])
+    stored = {
+        digest
+        for prefix in os.listdir(os.path.join('backups', 'chunks'))
+        for digest in os.listdir(os.path.join('backups', 'chunks', prefix))
+    }
+    assert stored == referenced
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Тести сітки: посів, швейцарська система, плей-офф"""
+
+import random
+
+import pytest
+
+import bracket
+
+
+def make_state(count):
+    registrations = [
+        {'team_name': f"Team {i}", 'team_tag': f"T{i}", 'user_id': 100 + i}
+        for i in range(count)
+    ]
+    return bracket.new_bracket(bracket.seed_teams(registrations))
+
+
+def play_round(matches, rng):
+    for match in matches:
+        if match['winner'] is None:
+            match['winner'] = rng.choice((match['a'], match['b']))
+
+
+def test_seed_teams_keeps_registration_order():
+    state = make_state(4)
+    assert [e['id'] for e in state['entrants']] == [0, 1, 2, 3]
+    assert [e['team_name'] for e in state['entrants']] == ["Team 0", "Team 1", "Team 2", "Team 3"]
+    assert state['entrants'][2]['user_id'] == 102
+
+
+def test_seed_teams_random_is_permutation():
+    registrations = [{'team_name': str(i), 'team_tag': str(i)} for i in range(32)]
+    entrants = bracket.seed_teams(registrations, randomize=True)
+    assert [e['id'] for e in entrants] == list(range(32))
+    assert sorted(e['team_name'] for e in entrants) == sorted(str(i) for i in range(32))
+
+
+def test_first_round_pairs_top_half_against_bottom_half():
+    state = make_state(8)
+    matches = bracket.pair_swiss_round(state)
+    assert [(m['a'], m['b']) for m in matches] == [(0, 4), (1, 5), (2, 6), (3, 7)]
+    assert [m['id'] for m in matches] == ['S1-1', 'S1-2', 'S1-3', 'S1-4']
+
+
+def test_odd_count_gives_bye_to_lowest_without_repeats():
+    state = make_state(7)
+    rng = random.Random(1)
+    byes = []
+    for _ in range(5):
+        matches = bracket.pair_swiss_round(state)
+        bye = [m for m in matches if m['b'] is None]
+        assert len(bye) == 1
+        assert bye[0]['winner'] == bye[0]['a']
+        byes.append(bye[0]['a'])
+        play_round(matches, rng)
+    assert len(set(byes)) == len(byes)
+    assert state['swiss']['byes'] == byes
+
+
+def test_next_round_requires_finished_round():
+    state = make_state(4)
+    bracket.pair_swiss_round(state)
+    with pytest.raises(ValueError):
+        bracket.pair_swiss_round(state)
+
+
+def test_every_team_plays_once_per_round_without_rematches():
+    state = make_state(64)
+    rng = random.Random(7)
+    for _ in range(6):
+        matches = bracket.pair_swiss_round(state)
+        teams = [m['a'] for m in matches] + [m['b'] for m in matches]
+        assert sorted(teams) == list(range(64))
+        play_round(matches, rng)
+
+    total = sum(len(r) for r in state['swiss']['rounds'])
+    assert len(bracket.played_pairs(state)) == total
+
+
+def test_swap_with_next_opponent_avoids_rematch():
+    pairs = []
+    rematches = bracket._pair_group([0, 1, 2, 3], {(0, 2)}, pairs)
+    assert rematches == 0
+    assert pairs == [(0, 3), (1, 2)]
+
+
+def test_swap_with_formed_pair_avoids_rematch():
+    pairs = []
+    rematches = bracket._pair_group([0, 1, 2, 3], {(1, 3)}, pairs)
+    assert rematches == 0
+    assert pairs == [(0, 3), (1, 2)]
+
+
+def test_unavoidable_rematch_is_counted():
+    pairs = []
+    rematches = bracket._pair_group([0, 1], {(0, 1)}, pairs)
+    assert rematches == 1
+    assert pairs == [(0, 1)]
+
+
+def test_odd_score_group_floats_one_team_down():
+    state = make_state(6)
+    for match in bracket.pair_swiss_round(state):
+        match['winner'] = match['a']  # переможці 0, 1, 2
+
+    matches = bracket.pair_swiss_round(state)
+    scores = bracket.swiss_scores(state)
+    mixed = [m for m in matches if {scores[m['a']], scores[m['b']]} == {0, 1}]
+    assert len(mixed) == 1
+    # Опускається найнижчий учасник групи переможців
+    assert 2 in (mixed[0]['a'], mixed[0]['b'])
+
+
+def test_swiss_scores_and_ranking():
+    state = make_state(4)
+    for match in bracket.pair_swiss_round(state):
+        match['winner'] = match['b']
+    assert bracket.swiss_scores(state) == {0: 0, 1: 0, 2: 1, 3: 1}
+    assert bracket.swiss_ranking(state) == [2, 3, 0, 1]
+
+
+def test_single_elimination_seeding_and_byes():
+    playoff = bracket.build_single_elimination([10, 11, 12, 13, 14], best_of=3)
+    rounds = playoff['rounds']
+    assert [len(r) for r in rounds] == [4, 2, 1]
+    assert [(m['a'], m['b']) for m in rounds[0]] == [(10, None), (13, 14), (11, None), (12, None)]
+    assert all(m['best_of'] == 3 for r in rounds for m in r)
+
+    # Технічні перемоги вже переведені в наступний раунд
+    assert rounds[1][0]['a'] == 10
+    assert rounds[1][1]['a'] == 11
+    assert rounds[1][1]['b'] == 12
+
+
+def test_single_elimination_needs_two_teams():
+    with pytest.raises(ValueError):
+        bracket.build_single_elimination([1])
+
+
+def test_advance_winner_fills_next_match_and_final():
+    playoff = bracket.build_single_elimination([0, 1, 2, 3], best_of=1)
+    first, second = playoff['rounds'][0]
+    first['winner'] = first['b']
+    second['winner'] = second['a']
+
+    assert bracket.advance_winner(playoff, first['id']) is playoff['rounds'][1][0]
+    bracket.advance_winner(playoff, second['id'])
+    final = playoff['rounds'][1][0]
+    assert (final['a'], final['b']) == (first['b'], second['a'])
+
+    final['winner'] = final['a']
+    assert bracket.advance_winner(playoff, final['id']) is None
+
+
+def test_find_match():
+    state = make_state(4)
+    bracket.pair_swiss_round(state)
+    assert bracket.find_match(state, 'S1-2')['id'] == 'S1-2'
+    assert bracket.find_match(state, 'S2-1') is None
+    assert bracket.find_match(state, 'P1-1') is None
+    assert bracket.find_match(state, 'Sx-1') is None
+
+    state['playoff'] = bracket.build_single_elimination([0, 1, 2, 3])
+    assert bracket.find_match(state, 'P2-1')['id'] == 'P2-1'
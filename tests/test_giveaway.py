@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Тести жеребкування розіграшу"""
+
+import asyncio
+import hashlib
+
+from telegram.error import BadRequest
+
+import main
+
+
+class Chat:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class Bot:
+    """Бот, для якого частина користувачів недоступна або API падає"""
+
+    def __init__(self, unreachable=(), down_after=None):
+        self.unreachable = set(unreachable)
+        self.down_after = down_after
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+
+    async def get_chat(self, user_id):
+        self.calls.append(user_id)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0)
+        self.active -= 1
+        if self.down_after is not None and len(self.calls) > self.down_after:
+            raise main.ApiUnavailable("down")
+        if user_id in self.unreachable:
+            raise BadRequest("Chat not found")
+        return Chat(user_id)
+
+
+def draw_all(draw):
+    indices = []
+    while True:
+        index = draw.draw()
+        if index is None:
+            return indices
+        indices.append(index)
+
+
+def test_fixed_seed_is_reproducible():
+    seed = bytes(range(32))
+    first = main.FairDraw(50, seed)
+    second = main.FairDraw(50, seed)
+    assert first.commitment == hashlib.sha256(seed).hexdigest()
+    assert [first.draw() for _ in range(20)] == [second.draw() for _ in range(20)]
+
+
+def test_draw_gives_distinct_indices_then_none():
+    draw = main.FairDraw(30, b'seed')
+    indices = draw_all(draw)
+    assert sorted(indices) == list(range(30))
+    assert draw.draw() is None
+
+
+def test_unreachable_users_are_redrawn():
+    pool = list(range(1000, 1020))
+    seed = b'redraw'
+    order = [pool[i] for i in draw_all(main.FairDraw(len(pool), seed))]
+    bot = Bot(unreachable=order[:3])
+
+    winners, drawn, unreachable, aborted = asyncio.run(
+        main.resolve_winners(bot, pool, main.FairDraw(len(pool), seed), 5)
+    )
+    assert not aborted
+    assert [w.id for w in winners] == order[3:8]
+    assert unreachable == order[:3]
+    assert drawn == order[:8]
+
+
+def test_pool_exhaustion_returns_fewer_winners():
+    pool = [1, 2, 3]
+    winners, drawn, unreachable, aborted = asyncio.run(
+        main.resolve_winners(Bot(unreachable=[2]), pool, main.FairDraw(3, b'small'), 3)
+    )
+    assert not aborted
+    assert sorted(w.id for w in winners) == [1, 3]
+    assert unreachable == [2]
+    assert sorted(drawn) == pool
+
+
+def test_api_outage_aborts_draw():
+    pool = list(range(100))
+    bot = Bot(down_after=main.GIVEAWAY_BATCH_SIZE)
+    winners, drawn, unreachable, aborted = asyncio.run(
+        main.resolve_winners(bot, pool, main.FairDraw(len(pool), b'outage'), 50)
+    )
+    assert aborted
+    assert len(winners) == main.GIVEAWAY_BATCH_SIZE
+    # Після збою нові жереби не тягнуться
+    assert len(drawn) == 2 * main.GIVEAWAY_BATCH_SIZE
+    assert unreachable == []
+
+
+def test_lookups_are_batched():
+    pool = list(range(200))
+    bot = Bot()
+    winners, _, _, _ = asyncio.run(
+        main.resolve_winners(bot, pool, main.FairDraw(len(pool), b'batch'), 150)
+    )
+    assert len(winners) == 150
+    assert len(bot.calls) == 150
+    assert bot.peak == main.GIVEAWAY_BATCH_SIZE
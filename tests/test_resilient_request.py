@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Тести шару вихідних запитів: повтори, ідемпотентність, circuit breaker"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+from telegram.request import HTTPXRequest
+
+import main
+
+
+def caused_by(error, cause):
+    """Помилка PTB, обгорнута навколо помилки httpx (як у HTTPXRequest)"""
+    try:
+        raise error from cause
+    except type(error) as e:
+        return e
+
+
+class Transport:
+    """Підміна HTTPXRequest.post: віддає заздалегідь задані відповіді"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    async def post(self, url, request_data=None, **kwargs):
+        self.calls.append(url.rsplit('/', 1)[-1])
+        outcome = self.outcomes.pop(0) if self.outcomes else {'ok': True}
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(main, 'API_BACKOFF_BASE', 0.001)
+    monkeypatch.setattr(main, 'API_BACKOFF_MAX', 0.001)
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    def install(*outcomes):
+        fake = Transport(*outcomes)
+        monkeypatch.setattr(HTTPXRequest, 'post', fake.post)
+        return fake
+    return install
+
+
+def call(request, method):
+    return asyncio.run(request.post(f'https://api.telegram.org/bot123/{method}'))
+
+
+def test_retry_after_is_retried(transport):
+    fake = transport(RetryAfter(0), {'ok': 1})
+    request = main.ResilientRequest()
+    assert call(request, 'sendMessage') == {'ok': 1}
+    assert fake.calls == ['sendMessage', 'sendMessage']
+    assert request.retried == 1
+
+
+def test_long_retry_after_is_not_waited(transport):
+    transport(RetryAfter(main.API_MAX_RETRY_AFTER + 1))
+    with pytest.raises(RetryAfter):
+        call(main.ResilientRequest(), 'sendMessage')
+
+
+def test_send_message_not_retried_after_read_error(transport):
+    fake = transport(caused_by(NetworkError("reset"), httpx.ReadError("reset")))
+    with pytest.raises(NetworkError):
+        call(main.ResilientRequest(), 'sendMessage')
+    assert fake.calls == ['sendMessage']
+
+
+def test_send_message_not_retried_after_read_timeout(transport):
+    fake = transport(caused_by(TimedOut(), httpx.ReadTimeout("slow")))
+    with pytest.raises(TimedOut):
+        call(main.ResilientRequest(), 'sendMessage')
+    assert fake.calls == ['sendMessage']
+
+
+@pytest.mark.parametrize('error', [
+    caused_by(NetworkError("connect"), httpx.ConnectError("refused")),
+    caused_by(TimedOut("pool"), httpx.PoolTimeout("busy")),
+])
+def test_unsent_request_is_retried(transport, error):
+    fake = transport(error, {'ok': 2})
+    assert call(main.ResilientRequest(), 'sendMessage') == {'ok': 2}
+    assert fake.calls == ['sendMessage', 'sendMessage']
+
+
+def test_idempotent_method_is_retried_after_read_error(transport):
+    fake = transport(caused_by(NetworkError("reset"), httpx.ReadError("reset")), {'ok': 3})
+    assert call(main.ResilientRequest(), 'getChat') == {'ok': 3}
+    assert len(fake.calls) == 2
+
+
+def test_retries_are_limited(transport):
+    errors = [caused_by(TimedOut(), httpx.ReadTimeout("slow")) for _ in range(10)]
+    fake = transport(*errors)
+    with pytest.raises(TimedOut):
+        call(main.ResilientRequest(), 'getChat')
+    assert len(fake.calls) == main.API_MAX_RETRIES + 1
+
+
+def test_message_not_modified_is_success(transport):
+    transport(BadRequest("Message is not modified: specified new message content is the same"))
+    assert call(main.ResilientRequest(), 'editMessageText') is True
+
+
+def test_other_bad_request_is_raised(transport):
+    transport(BadRequest("Chat not found"))
+    with pytest.raises(BadRequest):
+        call(main.ResilientRequest(), 'sendMessage')
+
+
+def test_breaker_opens_rejects_and_probes_after_cooldown(transport, monkeypatch):
+    monkeypatch.setattr(main, 'API_BREAKER_COOLDOWN', 0.05)
+    failures = [caused_by(NetworkError("reset"), httpx.ReadError("reset"))
+                for _ in range(main.API_BREAKER_THRESHOLD)]
+    fake = transport(*failures)
+    request = main.ResilientRequest()
+
+    for _ in range(main.API_BREAKER_THRESHOLD):
+        with pytest.raises(NetworkError):
+            call(request, 'sendMessage')
+
+    # Розімкнутий breaker відхиляє запит, не звертаючись до мережі
+    with pytest.raises(main.ApiUnavailable):
+        call(request, 'sendMessage')
+    assert len(fake.calls) == main.API_BREAKER_THRESHOLD
+    assert request.rejected == 1
+
+    time.sleep(0.06)
+    assert call(request, 'sendMessage') == {'ok': True}
+    assert request.failures == 0
+    assert len(fake.calls) == main.API_BREAKER_THRESHOLD + 1
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Тести запланованих оголошень і нагадувань"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import bracket
+import main
+
+
+class Bot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class Job:
+    def schedule_removal(self):
+        pass
+
+
+class JobQueue:
+    def __init__(self):
+        self.scheduled = []
+
+    def run_once(self, callback, when, name=None):
+        self.scheduled.append(when)
+        return Job()
+
+
+class Context:
+    def __init__(self):
+        self.bot = Bot()
+        self.job_queue = JobQueue()
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'audience_index', main.AudienceIndex())
+    main.save_data(main.SUBSCRIBERS_FILE, [1, 2])
+
+
+def ago(seconds):
+    return datetime.now() - timedelta(seconds=seconds)
+
+
+def fire(scheduler):
+    context = Context()
+    asyncio.run(scheduler.fire(context))
+    return context.bot.sent
+
+
+def make_bracket():
+    registrations = [
+        {'team_name': f"Team {i}", 'team_tag': f"T{i}", 'user_id': 100 + i} for i in range(2)
+    ]
+    state = bracket.new_bracket(bracket.seed_teams(registrations))
+    match = bracket.pair_swiss_round(state)[0]
+    return state, match
+
+
+def test_recurring_announcement_skips_missed_periods():
+    scheduler = main.AnnouncementScheduler()
+    now = time.time()
+    item = scheduler.add_announcement(ago(3.5 * 600), "Щогодини", 'all', 600, 1)
+
+    ready = scheduler._take_due(now)
+    assert ready == [('announcement', item)]
+    assert now < item['next_due'] <= now + 600
+    assert len(scheduler.heap) == 1
+
+
+def test_announcement_later_than_grace_is_dropped():
+    scheduler = main.AnnouncementScheduler()
+    once = scheduler.add_announcement(ago(main.SCHEDULE_MISSED_GRACE + 60), "Старе", 'all', None, 1)
+    repeating = scheduler.add_announcement(ago(main.SCHEDULE_MISSED_GRACE + 60), "Повтор", 'all', 3600, 1)
+
+    now = time.time()
+    assert scheduler._take_due(now) == []
+    assert once['next_due'] is None
+    # Повторюване не надсилається, але переноситься на наступний період
+    assert repeating['next_due'] > now
+
+
+def test_reload_after_fire_does_not_send_twice():
+    state, match = make_bracket()
+    match['start'] = (datetime.now() + timedelta(minutes=5)).isoformat(timespec='seconds')
+    main.save_bracket(state)
+
+    scheduler = main.AnnouncementScheduler()
+    scheduler.add_announcement(ago(10), "Старт", 'all', None, 1)
+    scheduler.add_reminder(10, "Скоро матч", 1)
+
+    sent = fire(scheduler)
+    assert sorted(chat_id for chat_id, _ in sent) == [1, 2, 100, 101]
+
+    reloaded = main.AnnouncementScheduler()
+    reloaded.ensure_loaded()
+    assert fire(reloaded) == []
+
+
+def test_cancelled_announcement_is_not_sent():
+    scheduler = main.AnnouncementScheduler()
+    item = scheduler.add_announcement(ago(10), "Скасоване", 'all', None, 1)
+    assert scheduler.cancel(item['id'])
+    # Запис лишається в купі, але відкидається при вийманні
+    assert scheduler.heap
+    assert fire(scheduler) == []
+
+
+def test_rescheduled_match_ignores_old_reminder():
+    state, match = make_bracket()
+    scheduler = main.AnnouncementScheduler()
+    scheduler.add_reminder(10, "Скоро матч", 1)
+
+    match['start'] = (datetime.now() + timedelta(minutes=5)).isoformat(timespec='seconds')
+    main.save_bracket(state)
+    scheduler.on_match_time(match)
+
+    # /match_time переносить матч на завтра - старе нагадування застаріло
+    match['start'] = (datetime.now() + timedelta(days=1)).isoformat(timespec='seconds')
+    main.save_bracket(state)
+    scheduler.on_match_time(match)
+
+    assert fire(scheduler) == []
+    assert scheduler.heap[0][0] > time.time()
+
+
+def test_parse_when_formats():
+    now = datetime(2025, 11, 20, 12, 0)
+    assert main.parse_when('+30m', now) == datetime(2025, 11, 20, 12, 30)
+    assert main.parse_when('18:30', now) == datetime(2025, 11, 20, 18, 30)
+    assert main.parse_when('09:00', now) == datetime(2025, 11, 21, 9, 0)
+    assert main.parse_when('2025-11-20T18:30', now) == datetime(2025, 11, 20, 18, 30)
+    assert main.parse_when('завтра', now) is None
+
+
+def test_parse_when_converts_offset_to_local_time():
+    when = main.parse_when('2025-11-20T18:30+02:00')
+    assert when.tzinfo is None
+    expected = datetime(2025, 11, 20, 16, 30, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    assert when == expected
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Тести бінарного формату знімків"""
+
+import json
+
+import pytest
+
+import snapshot
+
+
+TEAMS = [
+    {'team_name': "Наві", 'team_tag': "NAVI", 'cap_age': 19, 'user_id': 1},
+    {'team_name': "Team 2", 'team_tag': "T2", 'comments': "🔥 \"лапки\"\nрядок"},
+    {'team_name': "", 'team_tag': "", 'user_id': None},
+]
+
+
+@pytest.fixture
+def snap_path(tmp_path):
+    path = str(tmp_path / 'registrations.snap')
+    snapshot.write_snapshot(path, TEAMS)
+    return path
+
+
+def test_round_trip(snap_path):
+    assert snapshot.read_snapshot(snap_path) == TEAMS
+
+
+def test_lazy_access_and_labels(snap_path):
+    with snapshot.Snapshot(snap_path) as snap:
+        assert len(snap) == 3
+        assert snap[1] == TEAMS[1]
+        assert list(snap) == TEAMS
+        assert snap.label(0) == ("Наві", "NAVI")
+        assert snap.labels() == [("Наві", "NAVI"), ("Team 2", "T2"), ("", "")]
+        with pytest.raises(IndexError):
+            snap[3]
+
+
+def test_plain_list_records(tmp_path):
+    path = str(tmp_path / 'subscribers.snap')
+    snapshot.write_snapshot(path, [1, 2, 3])
+    assert snapshot.read_snapshot(path) == [1, 2, 3]
+
+
+def test_empty_list(tmp_path):
+    path = str(tmp_path / 'empty.snap')
+    snapshot.write_snapshot(path, [])
+    assert snapshot.read_snapshot(path) == []
+
+
+def corrupt(path, offset):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def test_checksum_detects_corrupt_record(snap_path):
+    corrupt(snap_path, snapshot.HEADER.size + 20)
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.read_snapshot(snap_path)
+
+
+def test_labels_without_verification_skip_checksum(snap_path):
+    # Пошкоджено JSON останнього запису - назви й теги читаються без CRC
+    with open(snap_path, 'rb') as f:
+        data = f.read()
+    corrupt(snap_path, data.rindex(b'null'))
+    with snapshot.Snapshot(snap_path, verify=False) as snap:
+        assert snap.label(0) == ("Наві", "NAVI")
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.Snapshot(snap_path)
+
+
+def test_bad_magic(snap_path):
+    corrupt(snap_path, 0)
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.Snapshot(snap_path)
+
+
+def test_truncated_file(snap_path):
+    with open(snap_path, 'r+b') as f:
+        f.truncate(snapshot.HEADER.size + 5)
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.Snapshot(snap_path, verify=False)
+
+
+def test_short_and_empty_files(tmp_path):
+    short = tmp_path / 'short.snap'
+    short.write_bytes(b'CS2S')
+    empty = tmp_path / 'empty.snap'
+    empty.write_bytes(b'')
+    for path in (short, empty):
+        with pytest.raises(snapshot.SnapshotError):
+            snapshot.Snapshot(str(path))
+
+
+def test_json_conversion_round_trip(tmp_path):
+    json_path = str(tmp_path / 'registrations.json')
+    snap_path = str(tmp_path / 'registrations.snap')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(TEAMS, f)
+
+    assert snapshot.json_to_snapshot(json_path, snap_path) == 3
+    (tmp_path / 'registrations.json').unlink()
+    assert snapshot.snapshot_to_json(snap_path, json_path) == 3
+    with open(json_path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == TEAMS
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Тести інкрементальної турнірної таблиці"""
+
+import random
+
+import bracket
+import standings
+
+
+def make_state(count):
+    registrations = [{'team_name': f"Team {i}", 'team_tag': f"T{i}"} for i in range(count)]
+    return bracket.new_bracket(bracket.seed_teams(registrations))
+
+
+def expected_buchholz(rows, team_id):
+    return sum(rows[opponent]['wins'] for opponent in rows[team_id]['opponents'])
+
+
+def play_tournament(count, rounds, seed):
+    """Зіграти турнір, оновлюючи таблицю так само, як це роблять команди бота"""
+    state = make_state(count)
+    rng = random.Random(seed)
+    for _ in range(rounds):
+        rows = standings.ensure_standings(state)
+        matches = bracket.pair_swiss_round(state)
+        standings.record_round(rows, matches)
+        for match in matches:
+            if match['winner'] is None:
+                score = [13, rng.randrange(12)]
+                if rng.random() < 0.5:
+                    score.reverse()
+                match['winner'] = match['a'] if score[0] > score[1] else match['b']
+                match['score'] = score
+                standings.apply_result(rows, match['a'], match['b'], match['winner'], *score)
+    return state
+
+
+def test_apply_result_updates_both_rows():
+    rows = [standings.new_row() for _ in range(2)]
+    standings.apply_result(rows, 0, 1, 0, 13, 9)
+    assert rows[0] == {
+        'wins': 1, 'losses': 0, 'rounds_for': 13, 'rounds_against': 9,
+        'buchholz': 0, 'opponents': [1],
+    }
+    assert rows[1] == {
+        'wins': 0, 'losses': 1, 'rounds_for': 9, 'rounds_against': 13,
+        'buchholz': 1, 'opponents': [0],
+    }
+
+
+def test_win_updates_buchholz_of_earlier_opponents():
+    rows = [standings.new_row() for _ in range(3)]
+    standings.apply_result(rows, 0, 1, 1, 5, 13)
+    standings.apply_result(rows, 1, 2, 1, 13, 2)
+    assert rows[0]['buchholz'] == 2
+    assert rows[2]['buchholz'] == 2
+
+
+def test_bye_counts_as_win_without_opponent():
+    rows = [standings.new_row() for _ in range(2)]
+    standings.apply_result(rows, 0, 1, 1, 0, 13)
+    standings.apply_bye(rows, 1)
+    assert rows[1]['wins'] == 2
+    assert rows[1]['opponents'] == [0]
+    assert rows[0]['buchholz'] == 2
+
+
+def test_incremental_buchholz_matches_recomputation():
+    for seed in range(10):
+        state = play_tournament(11, 5, seed)
+        rows = state['standings']
+        for team_id in range(len(rows)):
+            assert rows[team_id]['buchholz'] == expected_buchholz(rows, team_id)
+
+
+def test_incremental_table_matches_rebuild_from_matches():
+    for seed in range(10):
+        state = play_tournament(13, 4, seed)
+        incremental = state.pop('standings')
+        assert standings.ensure_standings(state) == incremental
+
+
+def test_ensure_standings_does_not_rebuild_existing_table():
+    state = make_state(2)
+    rows = standings.ensure_standings(state)
+    assert standings.ensure_standings(state) is rows
+
+
+def test_ranking_tie_breaks():
+    rows = [standings.new_row() for _ in range(4)]
+    rows[0].update(wins=1, buchholz=0, rounds_for=13, rounds_against=10)
+    rows[1].update(wins=1, buchholz=1, rounds_for=13, rounds_against=11)
+    rows[2].update(wins=1, buchholz=0, rounds_for=13, rounds_against=2)
+    rows[3].update(wins=2)
+    assert standings.ranking(rows) == [3, 1, 2, 0]
+
+
+def test_render_lines():
+    state = make_state(2)
+    matches = bracket.pair_swiss_round(state)
+    matches[0]['winner'] = 1
+    matches[0]['score'] = [7, 13]
+    assert standings.render(state) == [
+        "1. Team 1 [T1] — 1-0, Бх 0, +6",
+        "2. Team 0 [T0] — 0-1, Бх 1, -6",
+    ]
+
+
+def test_result_on_legacy_bracket_is_counted_once():
+    import main
+
+    state = make_state(4)
+    match = bracket.pair_swiss_round(state)[0]
+    assert 'standings' not in state
+
+    main.apply_match_result(state, match, 13, 5)
+    row = state['standings'][match['a']]
+    assert (row['wins'], row['rounds_for'], row['opponents']) == (1, 13, [match['b']])
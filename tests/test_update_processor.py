@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Тести пріоритетної обробки оновлень"""
+
+import asyncio
+
+import pytest
+
+import main
+
+
+class User:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeUpdate:
+    def __init__(self, user_id):
+        self.effective_user = User(user_id)
+        self.callback_query = None
+        self.effective_message = None
+
+
+ADMIN = main.ADMIN_IDS[0]
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(main, 'flood_control', main.FloodControl(1000, 1000, 100))
+    monkeypatch.setattr(main, 'registering_users', main.OrderedDict())
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_priority_order_when_workers_are_busy():
+    order = []
+
+    async def scenario():
+        processor = main.PriorityUpdateProcessor(workers=1, shed_depth=100)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        async def job(name):
+            order.append(name)
+
+        main.mark_registering(20)
+        tasks = [asyncio.create_task(processor.do_process_update(FakeUpdate(1), blocker()))]
+        await settle()
+        for user_id, name in ((10, 'public'), (20, 'registration'), (ADMIN, 'admin')):
+            tasks.append(asyncio.create_task(processor.do_process_update(FakeUpdate(user_id), job(name))))
+        await settle()
+        gate.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ['admin', 'registration', 'public']
+
+
+def test_updates_of_one_user_run_in_order():
+    events = []
+
+    async def scenario():
+        processor = main.PriorityUpdateProcessor(workers=4, shed_depth=100)
+
+        async def job(number, delay):
+            events.append(('start', number))
+            await asyncio.sleep(delay)
+            events.append(('end', number))
+
+        await asyncio.gather(*(
+            processor.do_process_update(FakeUpdate(5), job(number, delay))
+            for number, delay in ((1, 0.02), (2, 0), (3, 0.01))
+        ))
+
+    asyncio.run(scenario())
+    assert events == [('start', 1), ('end', 1), ('start', 2), ('end', 2), ('start', 3), ('end', 3)]
+
+
+def test_only_public_updates_are_shed():
+    ran = []
+
+    async def scenario():
+        processor = main.PriorityUpdateProcessor(workers=1, shed_depth=2)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        async def job(name):
+            ran.append(name)
+
+        tasks = [asyncio.create_task(processor.do_process_update(FakeUpdate(1), blocker()))]
+        await settle()
+        for user_id in (10, 11, 12, 13):
+            tasks.append(asyncio.create_task(processor.do_process_update(FakeUpdate(user_id), job(user_id))))
+        main.mark_registering(20)
+        tasks.append(asyncio.create_task(processor.do_process_update(FakeUpdate(20), job(20))))
+        tasks.append(asyncio.create_task(processor.do_process_update(FakeUpdate(ADMIN), job('admin'))))
+        await settle()
+        assert processor.shed == 2
+        gate.set()
+        await asyncio.gather(*tasks)
+        return processor
+
+    processor = asyncio.run(scenario())
+    assert sorted(map(str, ran)) == ['10', '11', '20', 'admin']
+    assert processor.queued == 0
+
+
+def test_flooded_updates_never_enter_queue(monkeypatch):
+    monkeypatch.setattr(main, 'flood_control', main.FloodControl(0, 1, 100))
+    ran = []
+
+    async def scenario():
+        processor = main.PriorityUpdateProcessor(workers=1, shed_depth=2)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        async def job(name):
+            ran.append(name)
+
+        tasks = [asyncio.create_task(processor.do_process_update(FakeUpdate(1), blocker()))]
+        # Флудер вичерпав токени - його оновлення не займають місця в черзі
+        tasks += [asyncio.create_task(processor.do_process_update(FakeUpdate(1), job('flood'))) for _ in range(10)]
+        await settle()
+        assert processor.queued == 0
+        tasks += [asyncio.create_task(processor.do_process_update(FakeUpdate(user_id), job(user_id))) for user_id in (2, 3)]
+        await settle()
+        gate.set()
+        await asyncio.gather(*tasks)
+        return processor
+
+    processor = asyncio.run(scenario())
+    assert ran == [2, 3]
+    assert processor.shed == 0
+    assert main.flood_control.dropped == 10
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        processor = main.PriorityUpdateProcessor(workers=1, shed_depth=100)
+        gate = asyncio.Event()
+        done = []
+
+        async def blocker():
+            await gate.wait()
+
+        async def job():
+            done.append(True)
+
+        first = asyncio.create_task(processor.do_process_update(FakeUpdate(1), blocker()))
+        await settle()
+        waiting = asyncio.create_task(processor.do_process_update(FakeUpdate(2), job()))
+        await settle()
+        waiting.cancel()
+        gate.set()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        await processor.do_process_update(FakeUpdate(3), job())
+        return processor, done
+
+    processor, done = asyncio.run(scenario())
+    assert done == [True]
+    assert processor._running == 0
+    assert processor.queued == 0
+    assert not processor._user_locks
+
+
+def test_cancel_while_waiting_for_own_previous_update():
+    async def scenario():
+        processor = main.PriorityUpdateProcessor(workers=4, shed_depth=100)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        async def job():
+            pass
+
+        first = asyncio.create_task(processor.do_process_update(FakeUpdate(1), blocker()))
+        await settle()
+        waiting = asyncio.create_task(processor.do_process_update(FakeUpdate(1), job()))
+        await settle()
+        assert processor.queued == 1
+        waiting.cancel()
+        await settle()
+        assert processor.queued == 0
+        gate.set()
+        await first
+        return processor
+
+    processor = asyncio.run(scenario())
+    assert processor._running == 0
+    assert not processor._user_locks
+
+
+def test_registration_priority_expires(monkeypatch):
+    monkeypatch.setattr(main, 'REGISTRATION_TIMEOUT', -1)
+    main.mark_registering(7)
+    assert main.classify_update(FakeUpdate(7)) == main.PRIORITY_PUBLIC
+    assert not main.registering_users